@@ -20,6 +20,9 @@ import os
 import toml
 from flask import Flask
 
+from anyrepo.api.circuit import circuit_breakers
+from anyrepo.api.http import http_pool
+from anyrepo.api.pool import client_pool
 from anyrepo.config import (
     ConfigError,
     check_config,
@@ -27,7 +30,14 @@ from anyrepo.config import (
     parse_config_hooks,
     parse_config_users,
 )
+from anyrepo.hooks.deliveries import deliveries
+from anyrepo.hooks.echoes import echoes
+from anyrepo.hooks.registry import hook_registry
+from anyrepo.hooks.requestlog import request_log
+from anyrepo.hooks.routing import routing_table
+from anyrepo.migrations import migrate
 from anyrepo.models import db
+from anyrepo.models.compression import compression
 from anyrepo.views import admin, login_manager
 
 
@@ -54,9 +64,21 @@ def create_app():
     app.config.update(converted_config)
     db.init_app(app)
     login_manager.init_app(app)
+    client_pool.init_app(app)
+    http_pool.init_app(app)
+    circuit_breakers.init_app(app)
+    hook_registry.init_app(app)
+    deliveries.init_app(app)
+    echoes.init_app(app)
+    routing_table.init_app(app)
+    request_log.init_app(app)
 
     with app.app_context():
+        check_config(app)
+        # migrations read compressed columns
+        compression.init_app(app)
         db.create_all()
+        migrate()
 
     # logs
     level = app.config.get("LOGLEVEL", "INFO")
@@ -65,9 +87,9 @@ def create_app():
     # admin
     app.register_blueprint(admin)
     with app.app_context():
-        check_config(app)
         parse_config_apis(config, app, db)
         parse_config_hooks(config, app, db)
         parse_config_users(config, app, db)
+        hook_registry.load()
 
     return app
@@ -17,10 +17,20 @@
 from abc import ABC, abstractmethod
 from typing import Optional
 
+import requests
+
+from anyrepo.api.ratelimit import RateBudget
+from anyrepo.cache import TTLCache
+
 
 class Comment(ABC):
     """API comment wrapper."""
 
+    @property
+    @abstractmethod
+    def id(self) -> int:
+        pass
+
     @property
     @abstractmethod
     def body(self) -> str:
@@ -30,12 +40,21 @@ class Comment(ABC):
 class Issue(ABC):
     """API issue wrapper."""
 
+    @property
+    @abstractmethod
+    def number(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_comment(self, comment_id: int) -> Optional[Comment]:
+        pass
+
     @abstractmethod
     def get_comment_from_body(self, body: str) -> Optional[Comment]:
         pass
 
     @abstractmethod
-    def create_comment(self, body: str):
+    def create_comment(self, body: str) -> Comment:
         pass
 
     @property
@@ -47,22 +66,58 @@ class Issue(ABC):
 class Project(ABC):
     """API project wrapper."""
 
+    @property
+    @abstractmethod
+    def path(self) -> str:
+        pass
+
+    @abstractmethod
+    def get_issue(self, number: int) -> Optional[Issue]:
+        pass
+
     @abstractmethod
     def get_issue_from_title(self, title: str) -> Optional[Issue]:
         pass
 
     @abstractmethod
-    def create_issue(self, title: str, body: str):
+    def create_issue(self, title: str, body: str) -> Issue:
         pass
 
 
 class API(ABC):
     """API wrapper."""
 
-    def __init__(self, url: str, token: str):
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        cache_size: int = 256,
+        cache_ttl: Optional[float] = 300,
+        negative_cache_ttl: Optional[float] = 60,
+        rate_limit_reserve: int = 10,
+        rate_limit_max_wait: float = 60,
+        session: Optional[requests.Session] = None,
+        timeout: int = 15,
+    ):
         self.url = url
         self.token = token
+        self.projects = TTLCache(cache_size, cache_ttl)
+        self.negative_cache_ttl = negative_cache_ttl
+        self.budget = RateBudget(rate_limit_reserve, rate_limit_max_wait)
+        self.session = session or requests.Session()
+        self.timeout = timeout
 
-    @abstractmethod
     def get_project_from_name(self, name: str) -> Optional[Project]:
+        """Get project by its name, caching the result even when the
+        project does not exist.
+        """
+        found, project = self.projects.lookup(name)
+        if not found:
+            project = self.find_project(name)
+            ttl = None if project else self.negative_cache_ttl
+            self.projects.set(name, project, ttl)
+        return project
+
+    @abstractmethod
+    def find_project(self, name: str) -> Optional[Project]:
         pass
@@ -0,0 +1,175 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import github
+import gitlab
+import requests
+from flask import Flask, current_app
+
+T = TypeVar("T")
+
+
+def is_retryable(err: Exception) -> bool:
+    """Whether an error of a forge call is transient: a network error, a
+    server error or a rate limit response.
+    """
+    if isinstance(err, github.GithubException):
+        return err.status >= 500 or isinstance(
+            err, github.RateLimitExceededException
+        )
+    if isinstance(err, gitlab.exceptions.GitlabError):
+        code = err.response_code
+        return code is not None and (code >= 500 or code == 429)
+    return isinstance(
+        err,
+        (
+            ConnectionError,
+            TimeoutError,
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ),
+    )
+
+
+def retry_call(
+    call: Callable[[], T],
+    attempts: int = 3,
+    backoff: float = 0.5,
+    max_backoff: float = 10,
+) -> T:
+    """Call, retrying transient errors up to attempts times in all.
+
+    Retries wait a random delay up to backoff seconds doubled on each
+    attempt and capped to max_backoff, so clients hit by the same outage
+    do not retry together.
+    """
+    for attempt in range(attempts):
+        try:
+            return call()
+        except Exception as err:
+            if attempt + 1 >= attempts or not is_retryable(err):
+                raise
+            delay = min(max_backoff, backoff * 2**attempt)
+            time.sleep(random.uniform(0, delay))
+    raise ValueError("attempts must be positive")
+
+
+class CircuitBreaker:
+    """Health of a forge, failing calls fast while it is down.
+
+    The circuit opens once failure_threshold calls in a row failed. Calls
+    are refused for reset_timeout seconds, then a single trial call is let
+    through which closes the circuit on success or opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Circuit state, "half-open" when a trial call is due."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    @property
+    def retry_at(self) -> datetime:
+        """When calls are allowed again (UTC)."""
+        with self._lock:
+            if self._opened_at is None:
+                return datetime.utcnow()
+            left = self._opened_at + self.reset_timeout - time.monotonic()
+        return datetime.utcnow() + timedelta(seconds=max(left, 0))
+
+    def allow(self) -> bool:
+        """Whether a call can be made, counting it as the trial call when
+        one is due.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_timeout:
+                # other calls keep being refused during the trial
+                self._opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit."""
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        """Count a failed call, opening the circuit past the threshold."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class CircuitBreakers:
+    """Process-level circuit breakers by API id.
+
+    CIRCUIT_FAILURE_THRESHOLD (5 by default) and CIRCUIT_RESET_TIMEOUT (60
+    seconds by default) config values set how they open and close.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.extensions["anyrepo_circuits"] = ({}, threading.Lock())
+
+    @property
+    def _state(self) -> Tuple[Dict[int, CircuitBreaker], threading.Lock]:
+        return current_app.extensions["anyrepo_circuits"]
+
+    def get(self, api_id: int) -> CircuitBreaker:
+        """Get the circuit breaker of an API."""
+        breakers, lock = self._state
+        with lock:
+            breaker = breakers.get(api_id)
+            if breaker is None:
+                breaker = breakers[api_id] = CircuitBreaker(
+                    current_app.config.get("CIRCUIT_FAILURE_THRESHOLD", 5),
+                    current_app.config.get("CIRCUIT_RESET_TIMEOUT", 60),
+                )
+            return breaker
+
+    def peek(self, api_id: int) -> Optional[CircuitBreaker]:
+        """Get the circuit breaker of an API if it has one."""
+        breakers, lock = self._state
+        with lock:
+            return breakers.get(api_id)
+
+
+circuit_breakers = CircuitBreakers()
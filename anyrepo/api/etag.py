@@ -0,0 +1,213 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import sqlite3
+import threading
+import time
+from hashlib import sha256
+from typing import Dict, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from anyrepo.cache import TTLCache
+
+# request headers a forge response can vary on, the token ones included so
+# no response is served to another identity
+VARY_HEADERS = ("Accept", "Authorization", "Private-Token", "Job-Token")
+
+# headers of the response as sent, not of the decoded body which is cached
+TRANSFER_HEADERS = ("Content-Encoding", "Content-Length", "Transfer-Encoding")
+
+
+class CachedResponse(NamedTuple):
+    """Validators, headers and body of a response."""
+
+    etag: Optional[str]
+    last_modified: Optional[str]
+    headers: Dict[str, str]
+    body: bytes
+
+
+def cache_key(request: requests.PreparedRequest) -> str:
+    """Key of a request, from its url and identity."""
+    parts = [request.url or ""]
+    parts.extend(request.headers.get(name, "") for name in VARY_HEADERS)
+    return sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseStore:
+    """Responses kept in a SQLite file so they survive restarts, pruned
+    down to the size most recently used ones.
+    """
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, size: int = 10000):
+        self.size = size
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS response ("
+            "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "headers TEXT NOT NULL, body BLOB NOT NULL, used_at REAL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_response_used_at "
+            "ON response (used_at)"
+        )
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get a stored response."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT etag, last_modified, headers, body FROM response "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE response SET used_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+        etag, last_modified, headers, body = row
+        return CachedResponse(etag, last_modified, json.loads(headers), body)
+
+    def set(self, key: str, entry: CachedResponse):
+        """Store a response."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    entry.etag,
+                    entry.last_modified,
+                    json.dumps(entry.headers),
+                    entry.body,
+                    time.time(),
+                ),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._connection.execute(
+                    "DELETE FROM response WHERE key NOT IN ("
+                    "SELECT key FROM response ORDER BY used_at DESC LIMIT ?)",
+                    (self.size,),
+                )
+
+
+class ResponseCache:
+    """Responses to forge GET requests, in memory and in a SQLite file
+    when a path is given.
+    """
+
+    def __init__(
+        self,
+        size: int = 1024,
+        path: Optional[str] = None,
+        file_size: int = 10000,
+    ):
+        self.memory = TTLCache(size)
+        self.store = ResponseStore(path, file_size) if path else None
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get the cached response of a request."""
+        entry = self.memory.get(key)
+        if entry is None and self.store is not None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    def set(self, key: str, entry: CachedResponse):
+        """Cache the response of a request."""
+        self.memory.set(key, entry)
+        if self.store is not None:
+            self.store.set(key, entry)
+
+
+class ConditionalAdapter(HTTPAdapter):
+    """HTTP adapter revalidating GET responses it has seen before.
+
+    Requests are sent with the validators of the cached response, and a
+    304 answer is turned back into the cached response with the fresh
+    headers, rate limit ones included. GitHub does not count 304 answers
+    against the rate limit.
+    """
+
+    def __init__(self, cache: ResponseCache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request: requests.PreparedRequest, **kwargs):
+        if request.method != "GET" or kwargs.get("stream"):
+            return super().send(request, **kwargs)
+
+        key = cache_key(request)
+        entry = self.cache.get(key)
+        if entry is not None:
+            if entry.etag:
+                request.headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request.headers["If-Modified-Since"] = entry.last_modified
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            return self._cached_response(entry, response)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 200 and (etag or last_modified):
+            headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name.title() not in TRANSFER_HEADERS
+            }
+            self.cache.set(
+                key,
+                CachedResponse(etag, last_modified, headers, response.content),
+            )
+        return response
+
+    @staticmethod
+    def _cached_response(
+        entry: CachedResponse, not_modified: requests.Response
+    ) -> requests.Response:
+        # reading the empty body gives the connection back to the pool
+        not_modified.content
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.headers.update(
+            (name, value)
+            for name, value in not_modified.headers.items()
+            if name.title() not in TRANSFER_HEADERS
+        )
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry.body
+        response.url = not_modified.url
+        response.request = not_modified.request
+        response.elapsed = not_modified.elapsed
+        response.connection = not_modified.connection
+        return response
@@ -24,13 +24,58 @@ from anyrepo.api import API, Comment, Issue, Project
 class GithubAPI(API):
     """Github client wrapper."""
 
-    def __init__(self, url: str, token: str):
-        super().__init__(url, token)
-        self._client = github.Github(base_url=url, login_or_token=token)
+    def __init__(self, url: str, token: str, **options):
+        super().__init__(url, token, **options)
+        # no retries of the requester, which PyGithub 2 makes with an
+        # adapter of its session: calls are retried by the request budget
+        # and retry_call, which trips circuit breakers
+        self._client = github.Github(
+            base_url=url,
+            login_or_token=token,
+            timeout=self.timeout,
+            retry=None,
+        )
         self._user = self._client.get_user()
+        self._share_session()
+        self._pace_requests()
+
+    def _share_session(self):
+        # the requester keeps a single connection object, built with a
+        # session of its own, whose adapter is replaced by the pooled one
+        requester = self._client._Github__requester
+        connection = requester._Requester__createConnection()
+        # PyGithub 2 sets a no-op auth so .netrc never replaces the token
+        self.session.auth = connection.session.auth
+        connection.session = self.session
+
+    def _pace_requests(self):
+        # every call of the client, redirects included, goes through this
+        # private method of its requester
+        requester = self._client._Github__requester
+        request_raw = requester._Requester__requestRaw
+
+        def paced_request_raw(*args, **kwargs):
+            self.budget.acquire()
+            status, headers, output = request_raw(*args, **kwargs)
+            if self.budget.update(headers) and status in (403, 429):
+                # primary or secondary limit hit, retry once allowed
+                self.budget.acquire()
+                status, headers, output = request_raw(*args, **kwargs)
+                self.budget.update(headers)
+            return status, headers, output
+
+        requester._Requester__requestRaw = paced_request_raw
+
+    def find_project(self, name: str) -> Optional[Project]:
+        """Get project by its name, or directly by its path when qualified
+        with its owner.
+        """
+        if "/" in name:
+            try:
+                return GithubProject(self._client.get_repo(name))
+            except github.UnknownObjectException:
+                return None
 
-    def get_project_from_name(self, name: str) -> Optional[Project]:
-        """Get project by its name."""
         repo_list = self._user.get_repos()
         for repo in repo_list:
             if repo.name == name:
@@ -44,6 +89,18 @@ class GithubProject(Project):
     def __init__(self, project: github.Repository.Repository):
         self._project = project
 
+    @property
+    def path(self) -> str:
+        """Project path with its namespace."""
+        return self._project.full_name
+
+    def get_issue(self, number: int) -> Optional[Issue]:
+        """Get issue from its number."""
+        try:
+            return GithubIssue(self._project.get_issue(number))
+        except github.UnknownObjectException:
+            return None
+
     def get_issue_from_title(self, title: str) -> Optional[Issue]:
         """Get issue from its name."""
         issues_list = self._project.get_issues(state="all")
@@ -52,9 +109,9 @@ class GithubProject(Project):
                 return GithubIssue(issue)
         return None
 
-    def create_issue(self, title: str, body: str):
+    def create_issue(self, title: str, body: str) -> Issue:
         """Create project issue."""
-        self._project.create_issue(title=title, description=body)
+        return GithubIssue(self._project.create_issue(title=title, body=body))
 
 
 class GithubIssue(Issue):
@@ -63,6 +120,18 @@ class GithubIssue(Issue):
     def __init__(self, issue: github.Issue.Issue):
         self._issue = issue
 
+    @property
+    def number(self) -> int:
+        """Issue number in its project."""
+        return self._issue.number
+
+    def get_comment(self, comment_id: int) -> Optional[Comment]:
+        """Get issue comment from its id."""
+        try:
+            return GithubComment(self._issue.get_comment(comment_id))
+        except github.UnknownObjectException:
+            return None
+
     def get_comment_from_body(self, body: str) -> Optional[Comment]:
         """Get issue comment from its body."""
         comment_list = self._issue.get_comments()
@@ -71,9 +140,9 @@ class GithubIssue(Issue):
                 return GithubComment(comment)
         return None
 
-    def create_comment(self, body: str):
+    def create_comment(self, body: str) -> Comment:
         """Create a comment for this issue."""
-        self._issue.create_comment(body=body)
+        return GithubComment(self._issue.create_comment(body=body))
 
     @property
     def state(self):
@@ -92,6 +161,11 @@ class GithubComment(Comment):
     def __init__(self, comment: github.IssueComment.IssueComment):
         self._comment = comment
 
+    @property
+    def id(self) -> int:
+        """Comment id."""
+        return self._comment.id
+
     @property
     def body(self) -> str:
         """Comment body."""
@@ -14,7 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from typing import Optional
+from typing import Optional, Union
 
 import gitlab
 import gitlab.v4.objects
@@ -25,12 +25,39 @@ from anyrepo.api import API, Comment, Issue, Project
 class GitlabAPI(API):
     """Wrapper for gitlab client."""
 
-    def __init__(self, url: str, token: str):
-        super().__init__(url, token)
-        self._client = gitlab.Gitlab(self.url, private_token=token)
+    def __init__(self, url: str, token: str, **options):
+        super().__init__(url, token, **options)
+        self._client = gitlab.Gitlab(
+            self.url,
+            private_token=token,
+            session=self.session,
+            timeout=self.timeout,
+        )
+        self._pace_requests()
+
+    def _pace_requests(self):
+        # 429 responses are retried by the client once Retry-After passed
+        session = self._client.session
+        send = session.send
+
+        def paced_send(request, **kwargs):
+            self.budget.acquire()
+            response = send(request, **kwargs)
+            self.budget.update(response.headers)
+            return response
+
+        session.send = paced_send
+
+    def find_project(self, name: str) -> Optional[Project]:
+        """Get project by its name, or directly by its path when qualified
+        with its namespace.
+        """
+        if "/" in name:
+            try:
+                return GitlabProject(self._client.projects.get(name))
+            except gitlab.exceptions.GitlabGetError:
+                return None
 
-    def get_project_from_name(self, name: str) -> Optional[Project]:
-        """Get project by its name."""
         repo_list = self._client.projects.list(search=name)
         repo = next(iter(repo_list), None)
         return GitlabProject(repo) if repo else None
@@ -42,6 +69,18 @@ class GitlabProject(Project):
     def __init__(self, project: gitlab.v4.objects.Project):
         self._project = project
 
+    @property
+    def path(self) -> str:
+        """Project path with its namespace."""
+        return self._project.path_with_namespace
+
+    def get_issue(self, number: int) -> Optional[Issue]:
+        """Get issue from its number."""
+        try:
+            return GitlabIssue(self._project.issues.get(number))
+        except gitlab.exceptions.GitlabGetError:
+            return None
+
     def get_issue_from_title(self, title: str) -> Optional[Issue]:
         """Get issue from its name."""
         issues_list = self._project.issues.list()
@@ -50,9 +89,12 @@ class GitlabProject(Project):
                 return GitlabIssue(issue)
         return None
 
-    def create_issue(self, title: str, body: str):
+    def create_issue(self, title: str, body: str) -> Issue:
         """Create project issue."""
-        self._project.issues.create({"title": title, "description": body})
+        issue = self._project.issues.create(
+            {"title": title, "description": body}
+        )
+        return GitlabIssue(issue)
 
 
 class GitlabIssue(Issue):
@@ -61,6 +103,18 @@ class GitlabIssue(Issue):
     def __init__(self, issue: gitlab.v4.objects.ProjectIssue):
         self._issue = issue
 
+    @property
+    def number(self) -> int:
+        """Issue number in its project."""
+        return self._issue.iid
+
+    def get_comment(self, comment_id: int) -> Optional[Comment]:
+        """Get issue comment from its id."""
+        try:
+            return GitlabComment(self._issue.notes.get(comment_id))
+        except gitlab.exceptions.GitlabGetError:
+            return None
+
     def get_comment_from_body(self, body: str) -> Optional[Comment]:
         """Get issue comment from its body."""
         comment_list = self._issue.discussions.list()
@@ -71,9 +125,9 @@ class GitlabIssue(Issue):
                     return GitlabComment(glcomment)
         return None
 
-    def create_comment(self, body: str):
+    def create_comment(self, body: str) -> Comment:
         """Create a comment for this issue."""
-        self._issue.discussions.create({"body": body})
+        return GitlabComment(self._issue.notes.create({"body": body}))
 
     @property
     def state(self):
@@ -90,9 +144,20 @@ class GitlabIssue(Issue):
 class GitlabComment(Comment):
     """Gitlab comment wrapper."""
 
-    def __init__(self, comment: gitlab.v4.objects.ProjectIssueDiscussionNote):
+    def __init__(
+        self,
+        comment: Union[
+            gitlab.v4.objects.ProjectIssueDiscussionNote,
+            gitlab.v4.objects.ProjectIssueNote,
+        ],
+    ):
         self._comment = comment
 
+    @property
+    def id(self) -> int:
+        """Comment id."""
+        return self._comment.id
+
     @property
     def body(self) -> str:
         """Comment body."""
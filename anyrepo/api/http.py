@@ -0,0 +1,102 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from flask import Flask, current_app
+from requests.adapters import HTTPAdapter
+
+from anyrepo.api.etag import ConditionalAdapter, ResponseCache
+
+
+class HTTPPool:
+    """Process-level HTTP connection pools by forge host.
+
+    Clients of a host share its keep-alive connections, so only the first
+    call to a host pays the TCP and TLS handshakes. HTTP_POOL_SIZE (10 by
+    default) connections are kept open per host.
+
+    GET responses are revalidated with their ETag or Last-Modified date.
+    ETAG_CACHE_SIZE (1024 by default, 0 to disable) responses are kept in
+    memory, and ETAG_CACHE_FILE_SIZE (10000 by default) in the SQLite file
+    at ETAG_CACHE_PATH when set.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        size = app.config.get("ETAG_CACHE_SIZE", 1024)
+        cache = None
+        if size:
+            cache = ResponseCache(
+                size,
+                app.config.get("ETAG_CACHE_PATH"),
+                app.config.get("ETAG_CACHE_FILE_SIZE", 10000),
+            )
+        app.extensions["anyrepo_http"] = ({}, cache, threading.Lock())
+
+    @property
+    def _state(
+        self,
+    ) -> Tuple[
+        Dict[Tuple, HTTPAdapter], Optional[ResponseCache], threading.Lock
+    ]:
+        return current_app.extensions["anyrepo_http"]
+
+    def get_adapter(self, url: str) -> HTTPAdapter:
+        """Get the connection pool of the host of url."""
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.hostname, parsed.port)
+        adapters, cache, lock = self._state
+        with lock:
+            adapter = adapters.get(key)
+            if adapter is None:
+                options = {
+                    "pool_connections": 1,
+                    "pool_maxsize": current_app.config.get(
+                        "HTTP_POOL_SIZE", 10
+                    ),
+                }
+                if cache is None:
+                    adapter = HTTPAdapter(**options)
+                else:
+                    adapter = ConditionalAdapter(cache, **options)
+                adapters[key] = adapter
+            return adapter
+
+    def session(self, url: str) -> requests.Session:
+        """Build a session for a client of the host of url, on its shared
+        connection pool.
+
+        Sessions are not shared themselves so clients keep their own hooks,
+        and cookies are refused so no state leaks from a token to another.
+        """
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = self.get_adapter(url)
+        # PyGithub adds the default port to urls, mount on the schemes
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+
+http_pool = HTTPPool()
@@ -0,0 +1,84 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from hashlib import sha256
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from flask import Flask, current_app
+
+from anyrepo.api import API
+
+
+def fingerprint(data: bytes) -> str:
+    """Short digest identifying a secret without decrypting it."""
+    return sha256(data).hexdigest()[:16]
+
+
+class ClientPool:
+    """Process-level cache of forge clients.
+
+    Clients are keyed by API id and a fingerprint of what they were built
+    from, so a modified row never gets a stale client even when another
+    process did the modification.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.extensions["anyrepo_clients"] = ({}, threading.Lock())
+
+    @property
+    def _state(
+        self,
+    ) -> Tuple[Dict[int, Tuple[Hashable, Optional[API]]], threading.Lock]:
+        return current_app.extensions["anyrepo_clients"]
+
+    def get(
+        self,
+        api_id: int,
+        key: Hashable,
+        factory: Callable[[], Optional[API]],
+    ) -> Optional[API]:
+        """Get the pooled client of an API, building it if key changed."""
+        clients, lock = self._state
+        with lock:
+            entry = clients.get(api_id)
+            if entry is not None and entry[0] == key:
+                return entry[1]
+
+        client = factory()
+        with lock:
+            clients[api_id] = (key, client)
+        return client
+
+    def peek(self, api_id: int) -> Optional[API]:
+        """Get the pooled client of an API without building it."""
+        clients, lock = self._state
+        with lock:
+            entry = clients.get(api_id)
+        return None if entry is None else entry[1]
+
+    def invalidate(self, api_id: int):
+        """Drop the pooled client of an API."""
+        clients, lock = self._state
+        with lock:
+            clients.pop(api_id, None)
+
+
+client_pool = ClientPool()
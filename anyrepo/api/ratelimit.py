@@ -0,0 +1,112 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional
+
+# calls are spread over the rest of the window once the remaining budget
+# falls below this share of the limit
+PACING_THRESHOLD = 0.1
+
+
+class RateLimited(Exception):
+    """Raised when a call would have to wait too long for the budget."""
+
+    def __init__(self, wait: float):
+        super().__init__(f"Rate limited for {wait:.0f} seconds")
+        self.wait = wait
+
+
+class RateBudget:
+    """Budget of the calls a forge client can make, tracked from the rate
+    limit headers of both forges.
+
+    Calls are let through while the budget is ample, then paced evenly
+    until the limit resets, and held once only reserve calls are left or a
+    forge asked to retry later. Calls which would wait more than max_wait
+    seconds raise RateLimited.
+    """
+
+    def __init__(self, reserve: int = 10, max_wait: float = 60):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset = 0.0
+        self._paused_until = 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait for the budget to allow a call."""
+        with self._lock:
+            now = time.time()
+            start = max(now, self._paused_until)
+            if self.remaining is not None and self.reset > now:
+                budget = self.remaining - self.reserve
+                if budget <= 0:
+                    start = max(start, self.reset)
+                elif self.remaining < (self.limit or 0) * PACING_THRESHOLD:
+                    start = max(start, self._next)
+                    self._next = start + (self.reset - now) / budget
+                self.remaining -= 1
+            wait = start - now
+
+        if wait > self.max_wait:
+            raise RateLimited(wait)
+        if wait > 0:
+            time.sleep(wait)
+
+    def update(self, headers: Mapping[str, str]) -> bool:
+        """Track the budget from response headers, return whether the
+        response was rate limited.
+        """
+        headers = {key.lower(): value for key, value in headers.items()}
+        remaining = headers.get(
+            "x-ratelimit-remaining", headers.get("ratelimit-remaining")
+        )
+        limit = headers.get(
+            "x-ratelimit-limit", headers.get("ratelimit-limit")
+        )
+        reset = headers.get(
+            "x-ratelimit-reset", headers.get("ratelimit-reset")
+        )
+        retry_after = headers.get("retry-after")
+
+        with self._lock:
+            if remaining is not None:
+                self.remaining = int(remaining)
+            if limit is not None:
+                self.limit = int(limit)
+            if reset is not None:
+                self.reset = float(reset)
+            if retry_after is not None and retry_after.isdigit():
+                self._paused_until = time.time() + int(retry_after)
+
+        return retry_after is not None or remaining == "0"
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Last known budget."""
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset": (
+                datetime.utcfromtimestamp(self.reset) if self.reset else None
+            ),
+        }
@@ -0,0 +1,146 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import signal
+
+import click
+
+from anyrepo import create_app
+from anyrepo.export import FORMATS, export_requests, filter_requests
+from anyrepo.migrations import get_version
+from anyrepo.models.hook import HookModel
+from anyrepo.models.request import RequestModel
+from anyrepo.replay import get_request_ids, replay_requests
+from anyrepo.retention import purge_requests
+from anyrepo.worker import Worker
+
+
+@click.group()
+def main():
+    """AnyRepo command line interface."""
+
+
+def check_status(ctx, param, value):
+    """Check a request status filter is "good", "bad" or an HTTP status."""
+    if value is None or value in ("good", "bad") or value.isdigit():
+        return value
+    raise click.BadParameter('Must be "good", "bad" or an HTTP status')
+
+
+@main.command()
+@click.option(
+    "-c", "--concurrency", type=int, help="Number of worker threads."
+)
+@click.option(
+    "-i",
+    "--poll-interval",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Seconds to wait when the queue is empty.",
+)
+def worker(concurrency, poll_interval):
+    """Process queued webhook events."""
+    app = create_app()
+    concurrency = concurrency or app.config.get("WORKER_CONCURRENCY", 4)
+    pool = Worker(app, concurrency, poll_interval)
+    signal.signal(signal.SIGTERM, lambda *args: pool.stop())
+    pool.run()
+
+
+@main.command()
+def purge():
+    """Delete logged requests out of retention."""
+    app = create_app()
+    with app.app_context():
+        deleted = purge_requests()
+    click.echo(f"Purged {deleted} requests")
+
+
+@main.command()
+def migrate():
+    """Migrate the database schema and show its version."""
+    app = create_app()
+    with app.app_context():
+        version = get_version()
+    click.echo(f"Database schema at version {version}")
+
+
+@main.command()
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(list(FORMATS)),
+    default="ndjson",
+    show_default=True,
+)
+@click.option("--hook", help="Endpoint of the hook to export requests of.")
+@click.option(
+    "--status", callback=check_status, help='"good", "bad" or an HTTP status.'
+)
+@click.option("--since", type=click.DateTime(), help="Start time (UTC).")
+@click.option("--until", type=click.DateTime(), help="End time (UTC).")
+@click.option("-o", "--output", type=click.File("w"), default="-")
+def export(fmt, hook, status, since, until, output):
+    """Stream logged requests as NDJSON or CSV."""
+    app = create_app()
+    with app.app_context():
+        hookmodel = None
+        if hook:
+            hookmodel = HookModel.query.filter_by(endpoint=hook).one_or_none()
+            if hookmodel is None:
+                raise click.BadParameter("Unknown hook", param_hint="--hook")
+
+        query = filter_requests(hookmodel, status, since, until)
+        for chunk in export_requests(query, fmt):
+            output.write(chunk)
+
+
+@main.command()
+@click.argument("slugs", nargs=-1)
+@click.option("--hook", help="Endpoint of the hook to replay requests of.")
+@click.option(
+    "--status", callback=check_status, help='"good", "bad" or an HTTP status.'
+)
+@click.option("--since", type=click.DateTime(), help="Start time (UTC).")
+@click.option("--until", type=click.DateTime(), help="End time (UTC).")
+@click.option(
+    "-c", "--concurrency", type=int, help="Number of requests at a time."
+)
+@click.option(
+    "-r", "--rate", type=float, help="Requests per second, 0 for no limit."
+)
+def replay(slugs, hook, status, since, until, concurrency, rate):
+    """Dispatch logged requests to their hook handlers again."""
+    app = create_app()
+    with app.app_context():
+        hookmodel = None
+        if hook:
+            hookmodel = HookModel.query.filter_by(endpoint=hook).one_or_none()
+            if hookmodel is None:
+                raise click.BadParameter("Unknown hook", param_hint="--hook")
+
+        query = filter_requests(hookmodel, status, since, until)
+        if slugs:
+            query = query.filter(RequestModel.slug.in_(slugs))
+        ids = get_request_ids(query)
+
+    outcomes = replay_requests(app, ids, concurrency, rate)
+    click.echo(
+        f"Replayed {outcomes['replayed']} requests, "
+        f"{outcomes['failed']} failed"
+    )
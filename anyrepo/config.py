@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
 from typing import Any, Dict
 
 from cryptography.fernet import Fernet
@@ -24,6 +25,7 @@ from flask_sqlalchemy import SQLAlchemy
 from anyrepo.hooks.github_hook import github_hook
 from anyrepo.hooks.gitlab_hook import gitlab_hook
 from anyrepo.models.api import ApiModel, ApiType
+from anyrepo.models.compression import zstandard
 from anyrepo.models.hook import HookModel, HookType
 from anyrepo.models.user import User
 
@@ -52,6 +54,16 @@ def check_config(app: Flask):
         msg = str(err)
         raise ConfigError(msg) from err
 
+    codec = app.config.get("REQUEST_COMPRESSION", "zlib")
+    if codec not in ("zlib", "zstd", "none"):
+        raise ConfigError("Invalid request compression")
+    if codec == "zstd" and zstandard is None:
+        raise ConfigError("zstd request compression needs zstandard")
+
+    path = app.config.get("REQUEST_COMPRESSION_DICT")
+    if path and not os.path.isfile(path):
+        raise ConfigError("Request compression dictionary not found")
+
 
 def parse_config_hooks(config: Dict[str, Any], app: Flask, db: SQLAlchemy):
     """Pre populate Hook table with config and register blueprints."""
@@ -75,6 +87,11 @@ def parse_config_hooks(config: Dict[str, Any], app: Flask, db: SQLAlchemy):
                 db.session.add(dbhook)
 
             dbhook.set_secret(hook["secret"])
+            app.config.setdefault("HOOK_OPTIONS", {})[endpoint] = {
+                key: value
+                for key, value in hook.items()
+                if key not in ("endpoint", "type", "secret")
+            }
             app.logger.info(
                 f"Registered a blueprint for a {hook['type']} hook at "
                 f"{hook['endpoint']}"
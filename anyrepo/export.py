@@ -0,0 +1,113 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+from flask import current_app
+from sqlalchemy.orm import Query, undefer_group
+
+from anyrepo.models.hook import HookModel
+from anyrepo.models.request import RequestModel
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+FIELDS = (
+    "slug",
+    "hook",
+    "created_at",
+    "status",
+    "headers",
+    "body",
+    "response",
+)
+
+
+def filter_requests(
+    hook: Optional[HookModel] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Query:
+    """Get the requests of a hook, with a status ("good", "bad" or an HTTP
+    status) and received in a time range, oldest first.
+    """
+    query = RequestModel.query
+    if hook is not None:
+        query = query.filter(RequestModel.hook_id == hook.id)
+    if status == "good":
+        query = query.filter(RequestModel.succeeded)
+    elif status == "bad":
+        query = query.filter(~RequestModel.succeeded)
+    elif status:
+        query = query.filter(RequestModel.status == int(status))
+    if since is not None:
+        query = query.filter(RequestModel.created_at >= since)
+    if until is not None:
+        query = query.filter(RequestModel.created_at < until)
+    return query.order_by(RequestModel.created_at, RequestModel.id)
+
+
+def serialize_request(
+    request_model: RequestModel, endpoint: str
+) -> Dict[str, Any]:
+    """Get the exported fields of a request of the hook at endpoint."""
+    return {
+        "slug": request_model.slug,
+        "hook": endpoint,
+        "created_at": request_model.created_at.isoformat(),
+        "status": request_model.status,
+        "headers": request_model.headers,
+        "body": request_model.body,
+        "response": request_model.response,
+    }
+
+
+def export_requests(query: Query, fmt: str = "ndjson") -> Iterator[str]:
+    """Stream requests as NDJSON lines or CSV rows.
+
+    Rows are fetched through a server-side cursor, EXPORT_BATCH_SIZE (1000
+    by default) at a time, so memory use does not depend on their number.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt}")
+
+    batch_size = current_app.config.get("EXPORT_BATCH_SIZE", 1000)
+    # hooks are few, do not lazy load them row by row
+    endpoints = dict(
+        HookModel.query.with_entities(HookModel.id, HookModel.endpoint)
+    )
+    rows = query.options(undefer_group("payload")).yield_per(batch_size)
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    if fmt == "csv":
+        writer.writeheader()
+        yield buffer.getvalue()
+
+    for request_model in rows:
+        data = serialize_request(
+            request_model, endpoints[request_model.hook_id]
+        )
+        if fmt == "ndjson":
+            yield json.dumps(data) + "\n"
+        else:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(data)
+            yield buffer.getvalue()
@@ -13,3 +13,371 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from flask import abort, current_app, request
+from sqlalchemy import and_, or_
+
+from anyrepo.api import Comment, Issue, Project
+from anyrepo.api.circuit import circuit_breakers, is_retryable, retry_call
+from anyrepo.api.ratelimit import RateLimited
+from anyrepo.hooks.registry import HookEntry, hook_registry
+from anyrepo.hooks.requestlog import request_log
+from anyrepo.hooks.routing import Target
+from anyrepo.models import db
+from anyrepo.models.job import JobModel
+from anyrepo.models.link import CommentLinkModel, IssueLinkModel, body_hash
+
+
+class Event(NamedTuple):
+    """Webhook event being processed, for a single target API when it was
+    parked for it.
+    """
+
+    type: str
+    data: dict
+    api_id: Optional[int] = None
+
+
+class SourceIssue(NamedTuple):
+    """Issue a webhook event is about."""
+
+    host: str
+    project: str
+    number: int
+
+
+class SourceComment(NamedTuple):
+    """Issue comment a webhook event is about."""
+
+    issue: SourceIssue
+    id: int
+
+
+def get_current_hook() -> HookEntry:
+    """Get the registered hook of the current webhook delivery or abort."""
+    hook = hook_registry.get(request.url_rule.rule)
+    if hook is None:
+        abort(404)
+    return hook
+
+
+def enqueue_event(
+    event_type: str, delivery_id: Optional[str] = None
+) -> JobModel:
+    """Persist the current webhook delivery in the job queue."""
+    hook = get_current_hook()
+
+    job = JobModel(
+        hook_id=hook.id,
+        delivery_id=delivery_id,
+        event_type=event_type,
+        payload=request.data.decode("utf-8"),
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def get_hook_option(endpoint: str, name: str, default: Any = None) -> Any:
+    """Get a hook option from its config part, falling back on the app
+    config then on the given default.
+    """
+    options = current_app.config.get("HOOK_OPTIONS", {}).get(endpoint, {})
+    if name in options:
+        return options[name]
+    return current_app.config.get(name.upper(), default)
+
+
+def get_target_path(endpoint: str, path: str) -> str:
+    """Get the name of the project mirroring the source project path.
+
+    The longest source namespace of the hook ``namespaces`` option matching
+    the path is replaced by its target namespace, giving a qualified path
+    forges look up directly ("" matches every path). Unmapped projects are
+    looked up by their bare name.
+    """
+    namespaces = get_hook_option(endpoint, "namespaces", {})
+    matches = [
+        namespace
+        for namespace in namespaces
+        if not namespace
+        or path == namespace
+        or path.startswith(f"{namespace}/")
+    ]
+    if not matches:
+        return path.split("/")[-1]
+
+    namespace = max(matches, key=len)
+    target = namespaces[namespace].strip("/")
+    rest = path.replace(namespace, "", 1).strip("/")
+    if not target or not rest:
+        return target or rest
+    return f"{target}/{rest}"
+
+
+def fan_out(
+    targets: List[Target], sync: Callable[[Target], dict], width: int
+) -> Dict[str, dict]:
+    """Run sync for every target, at most width at a time, and merge
+    their statuses by target name.
+    """
+    if width <= 1 or len(targets) <= 1:
+        return {target.name: sync(target) for target in targets}
+
+    app = current_app._get_current_object()
+
+    def run(target: Target) -> dict:
+        with app.app_context():
+            return sync(target)
+
+    with ThreadPoolExecutor(max_workers=min(width, len(targets))) as ex:
+        results = list(ex.map(run, targets))
+
+    return {target.name: res for target, res in zip(targets, results)}
+
+
+def call_target(target: Target, sync: Callable[[Target], dict]) -> dict:
+    """Sync a target, retrying transient errors, and get a "parked" status
+    instead when the target is unavailable.
+
+    RETRY_ATTEMPTS (3 by default), RETRY_BACKOFF (0.5 second by default)
+    and RETRY_MAX_BACKOFF (10 seconds by default) config values set how
+    transient errors are retried. Targets failing anyway trip their circuit
+    breaker, which parks their events without calling them until it closes.
+    Events are only parked when a worker runs them, see sync_targets.
+    """
+    breaker = circuit_breakers.get(target.api.id)
+    if not breaker.allow():
+        return {"status": "parked"}
+
+    config = current_app.config
+    try:
+        response = retry_call(
+            lambda: sync(target),
+            config.get("RETRY_ATTEMPTS", 3),
+            config.get("RETRY_BACKOFF", 0.5),
+            config.get("RETRY_MAX_BACKOFF", 10),
+        )
+    except RateLimited as err:
+        current_app.logger.warning(f"{target.name}: {err}")
+        return {"status": "parked"}
+    except Exception as err:
+        current_app.logger.error(str(err))
+        if is_retryable(err):
+            breaker.record_failure()
+            return {"status": "parked"}
+        breaker.record_success()
+        return {"status": "error"}
+
+    breaker.record_success()
+    return response
+
+
+def park_event(hook_id: int, event: Event, targets: List[Target]):
+    """Queue an event again for each target, once their circuit closes."""
+    for target in targets:
+        retry_at = circuit_breakers.get(target.api.id).retry_at
+        db.session.add(
+            JobModel(
+                hook_id=hook_id,
+                api_id=target.api.id,
+                event_type=event.type,
+                payload=json.dumps(event.data),
+                scheduled_at=max(
+                    retry_at, datetime.utcnow() + timedelta(seconds=1)
+                ),
+            )
+        )
+    db.session.commit()
+
+
+def can_park() -> bool:
+    """Whether parked events get run, which needs an ``anyrepo worker``.
+
+    PARK_EVENTS defaults to ASYNC_HOOKS, as workers run with queued hooks.
+    """
+    config = current_app.config
+    return bool(config.get("PARK_EVENTS", config.get("ASYNC_HOOKS", False)))
+
+
+def failed(response: dict) -> bool:
+    """Whether an event response reports an error, for any target."""
+    statuses = [response] + [
+        value for value in response.values() if isinstance(value, dict)
+    ]
+    return any(status.get("status") == "error" for status in statuses)
+
+
+def sync_targets(
+    endpoint: str,
+    targets: List[Target],
+    sync: Callable[[Target], dict],
+    event: Optional[Event] = None,
+) -> Dict[str, dict]:
+    """Fan an event out to its targets and count their sync statuses.
+
+    Events are queued again for the targets they were parked for, unless
+    they already are a parked event. Without a worker to run them, these
+    targets get an "error" status instead.
+    """
+    if event is not None and event.api_id is not None:
+        targets = [
+            target for target in targets if target.api.id == event.api_id
+        ]
+
+    results = fan_out(
+        targets,
+        lambda target: call_target(target, sync),
+        get_hook_option(endpoint, "fanout_width", 4),
+    )
+
+    parked = [
+        target
+        for target in targets
+        if results[target.name].get("status") == "parked"
+    ]
+    if event is not None and event.api_id is not None:
+        # parked events are scheduled again by the worker
+        parked = []
+    elif event is None or not can_park():
+        for target in parked:
+            results[target.name] = {"status": "error"}
+        parked = []
+
+    hook = hook_registry.get(endpoint)
+    if hook is not None and targets:
+        request_log.add_outcomes(
+            hook.id,
+            {
+                target.api.id: results[target.name].get("status", "unknown")
+                for target in targets
+            },
+        )
+        if parked and event is not None:
+            park_event(hook.id, event, parked)
+    return results
+
+
+def find_issue(
+    source: SourceIssue, project: Project, target_host: str, title: str
+) -> Optional[Issue]:
+    """Get the issue mirroring the source one in the target project.
+
+    Issues synced before links were recorded are looked up by title and
+    linked on the way.
+    """
+    number = IssueLinkModel.get_linked_number(
+        source.host, source.project, source.number, target_host, project.path
+    )
+    if number is not None:
+        return project.get_issue(number)
+
+    issue = project.get_issue_from_title(title)
+    if issue:
+        link_issue(source, project, target_host, issue)
+    return issue
+
+
+def link_issue(
+    source: SourceIssue, project: Project, target_host: str, issue: Issue
+):
+    """Record that issue mirrors the source one in the target project."""
+    IssueLinkModel.query.filter_by(
+        source_host=source.host,
+        source_project=source.project,
+        source_number=source.number,
+        target_host=target_host,
+        target_project=project.path,
+    ).delete()
+    db.session.add(
+        IssueLinkModel(
+            source_host=source.host,
+            source_project=source.project,
+            source_number=source.number,
+            target_host=target_host,
+            target_project=project.path,
+            target_number=issue.number,
+        )
+    )
+    db.session.commit()
+
+
+def find_comment(
+    source: SourceComment,
+    project: Project,
+    issue: Issue,
+    target_host: str,
+    body: str,
+) -> Optional[Comment]:
+    """Get the comment mirroring the source one in the target issue.
+
+    Comments are looked up by link, then by the hash of their body among the
+    linked comments of the issue, and at last by scanning the issue
+    comments; a comment found that way gets linked.
+    """
+    comment_id = CommentLinkModel.get_linked_id(
+        source.issue.host, source.id, target_host, project.path
+    )
+    if comment_id is None:
+        comment_id = CommentLinkModel.get_id_from_body(
+            target_host, project.path, issue.number, body
+        )
+    if comment_id is not None:
+        return issue.get_comment(comment_id)
+
+    comment = issue.get_comment_from_body(body)
+    if comment:
+        link_comment(source, project, issue, target_host, comment, body)
+    return comment
+
+
+def link_comment(
+    source: SourceComment,
+    project: Project,
+    issue: Issue,
+    target_host: str,
+    comment: Comment,
+    body: str,
+):
+    """Record that comment mirrors the source one, replacing any previous
+    link so the stored body hash stays current.
+    """
+    unlink_comment(source, target_host)
+    db.session.add(
+        CommentLinkModel(
+            source_host=source.issue.host,
+            source_project=source.issue.project,
+            source_issue=source.issue.number,
+            source_comment=source.id,
+            target_host=target_host,
+            target_project=project.path,
+            target_issue=issue.number,
+            target_comment=comment.id,
+            body_hash=body_hash(body),
+        )
+    )
+    db.session.commit()
+
+
+def unlink_comment(source: SourceComment, target_host: str):
+    """Forget the links between the source comment and its mirror."""
+    CommentLinkModel.query.filter(
+        or_(
+            and_(
+                CommentLinkModel.source_host == source.issue.host,
+                CommentLinkModel.source_comment == source.id,
+                CommentLinkModel.target_host == target_host,
+            ),
+            and_(
+                CommentLinkModel.target_host == source.issue.host,
+                CommentLinkModel.target_comment == source.id,
+                CommentLinkModel.source_host == target_host,
+            ),
+        )
+    ).delete(synchronize_session=False)
+    db.session.commit()
@@ -0,0 +1,110 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy.exc import IntegrityError
+
+from anyrepo.cache import TTLCache
+from anyrepo.models import db
+from anyrepo.models.delivery import DeliveryModel
+from anyrepo.models.job import JobModel, JobStatus
+from anyrepo.models.request import RequestModel
+
+
+class DeliveryLog:
+    """Ids of the webhook deliveries already received, to tell the ones
+    forges retry.
+
+    The DELIVERY_CACHE_SIZE (10000 by default) most recent ids of
+    deliveries being processed or synced are kept in process. Others are
+    looked up among the requests logged as synced and the jobs which did
+    not fail, so a delivery which failed to sync can be received again.
+
+    Deliveries are also claimed in the database when received, for
+    DELIVERY_CLAIM_TTL seconds (3600 by default), so a retry reaching
+    another process while the delivery is being processed is dropped too.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        size = app.config.get("DELIVERY_CACHE_SIZE", 10000)
+        app.extensions["anyrepo_deliveries"] = TTLCache(maxsize=size)
+
+    @property
+    def _cache(self) -> TTLCache:
+        return current_app.extensions["anyrepo_deliveries"]
+
+    def seen(self, delivery_id: str) -> bool:
+        """Whether the delivery was received before, recording it if not."""
+        if delivery_id in self._cache:
+            return True
+
+        synced = db.session.query(
+            RequestModel.query.filter(
+                RequestModel.delivery_id == delivery_id,
+                RequestModel.status == 200,
+            ).exists()
+        ).scalar()
+        queued = db.session.query(
+            JobModel.query.filter(
+                JobModel.delivery_id == delivery_id,
+                JobModel.status != JobStatus.FAILED,
+            ).exists()
+        ).scalar()
+        # queued deliveries are not cached as their job can still fail
+        if synced or queued or not self._claim(delivery_id):
+            return True
+
+        self._cache.add(delivery_id)
+        return False
+
+    def forget(self, delivery_id: str):
+        """Let the delivery be received again, when it was not synced."""
+        self._cache.pop(delivery_id)
+        DeliveryModel.query.filter_by(delivery_id=delivery_id).delete()
+        db.session.commit()
+
+    def _claim(self, delivery_id: str) -> bool:
+        """Record the delivery in the database, unless another process
+        already did.
+        """
+        now = datetime.utcnow()
+        ttl = current_app.config.get("DELIVERY_CLAIM_TTL", 3600)
+        DeliveryModel.query.filter(
+            DeliveryModel.delivery_id == delivery_id,
+            DeliveryModel.expires_at <= now,
+        ).delete()
+        db.session.add(
+            DeliveryModel(
+                delivery_id=delivery_id,
+                expires_at=now + timedelta(seconds=ttl),
+            )
+        )
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return False
+        return True
+
+
+deliveries = DeliveryLog()
@@ -0,0 +1,95 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+from hashlib import sha256
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy.exc import IntegrityError
+
+from anyrepo.cache import TTLCache
+from anyrepo.models import db
+from anyrepo.models.echo import EchoModel
+
+
+def fingerprint(
+    host: str, project: str, kind: str, id_: int, content: str
+) -> str:
+    """Hash of a write on a forge object, "issue" or "comment"."""
+    key = "\n".join([host, project, kind, str(id_), content])
+    return sha256(key.encode("utf-8")).hexdigest()
+
+
+def issue_state(value: str) -> str:
+    """Normalize issue states and actions of both forges."""
+    return "closed" if value.startswith("close") else "opened"
+
+
+class EchoLog:
+    """Fingerprints of the writes made on forges, to drop the webhook
+    events they trigger back instead of mirroring them again.
+
+    Fingerprints expire after ECHO_TTL seconds (120 by default). They are
+    stored in the database, since queue workers write what web processes
+    receive, and cached in process.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        ttl = app.config.get("ECHO_TTL", 120)
+        app.extensions["anyrepo_echoes"] = TTLCache(maxsize=10000, ttl=ttl)
+
+    @property
+    def _cache(self) -> TTLCache:
+        return current_app.extensions["anyrepo_echoes"]
+
+    def record(
+        self, host: str, project: str, kind: str, id_: int, content: str
+    ):
+        """Record a write made on a forge object."""
+        key = fingerprint(host, project, kind, id_, content)
+        self._cache.set(key, True)
+
+        expires_at = datetime.utcnow() + timedelta(seconds=self._cache.ttl)
+        EchoModel.query.filter_by(fingerprint=key).delete()
+        db.session.add(EchoModel(fingerprint=key, expires_at=expires_at))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # another process recorded the same write
+            db.session.rollback()
+
+    def is_echo(
+        self, host: str, project: str, kind: str, id_: int, content: str
+    ) -> bool:
+        """Whether an event is about a write recently made on a forge."""
+        key = fingerprint(host, project, kind, id_, content)
+        if key in self._cache:
+            return True
+
+        return db.session.query(
+            EchoModel.query.filter(
+                EchoModel.fingerprint == key,
+                EchoModel.expires_at > datetime.utcnow(),
+            ).exists()
+        ).scalar()
+
+
+echoes = EchoLog()
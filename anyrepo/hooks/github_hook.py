@@ -16,6 +16,7 @@
 
 import hmac
 import json
+from typing import Optional
 from urllib.parse import urlparse
 
 from flask import (
@@ -23,25 +24,41 @@ from flask import (
     Response,
     abort,
     current_app,
+    g,
     jsonify,
     make_response,
     request,
 )
 
-from anyrepo.models import db
-from anyrepo.models.api import ApiModel
-from anyrepo.models.hook import HookModel
-from anyrepo.models.request import RequestModel
+from anyrepo.hooks import (
+    Event,
+    SourceComment,
+    SourceIssue,
+    enqueue_event,
+    failed,
+    find_comment,
+    find_issue,
+    get_current_hook,
+    get_target_path,
+    link_comment,
+    link_issue,
+    sync_targets,
+    unlink_comment,
+)
+from anyrepo.hooks.deliveries import deliveries
+from anyrepo.hooks.echoes import echoes, issue_state
+from anyrepo.hooks.requestlog import request_log
+from anyrepo.hooks.routing import Target, routing_table
+from anyrepo.models.request import SYNC_FAILED_STATUS
 
 github_hook = Blueprint("github_hook", __name__)
+DELIVERY_HEADER = "X-GitHub-Delivery"
 
 
 @github_hook.before_request
 def check_validity():
     """Check secret and headers validity or raise an error."""
-    endpoint = request.url_rule.rule
-    hook = HookModel.query.filter_by(endpoint=endpoint).first_or_404()
-    secret = hook.get_secret()
+    secret = get_current_hook().secret
 
     header_sign = request.headers.get("X-Hub-Signature")
     if not header_sign:
@@ -67,131 +84,227 @@ def check_validity():
         current_app.logger.error(msg)
         abort(make_response(jsonify(message=msg), 403))
 
+    delivery_id = request.headers.get(DELIVERY_HEADER)
+    if delivery_id and deliveries.seen(delivery_id):
+        current_app.logger.info(f"Duplicate delivery {delivery_id}")
+        g.duplicate_delivery = True
+        abort(make_response(jsonify(status="duplicate"), 200))
+
 
 @github_hook.route("/", methods=["POST"])
 def index():
-    data = request.get_json()
     event_type = request.headers.get("X-GitHub-Event", "ping")
+    if event_type != "ping" and current_app.config.get("ASYNC_HOOKS"):
+        job = enqueue_event(event_type, request.headers.get(DELIVERY_HEADER))
+        return make_response(jsonify(status="queued", job=job.slug), 202)
+
+    data = request.get_json()
 
     try:
-        response = {"status": "skipped"}
-        if event_type == "ping":
-            response = {"msg": "pong"}
-        elif event_type == "issues":
-            response = manage_issues(data)
-        elif event_type == "issue_comment":
-            response = manage_issue_comment(data)
+        response = process_event(event_type, data, request.url_rule.rule)
     except Exception as err:
         current_app.logger.error(str(err))
         response = {"status": "error"}
 
+    # forges still get a 200, or they would disable the hook and redeliver
+    # to the targets which synced, only the log records the failure
+    g.sync_failed = failed(response)
     return jsonify(response)
 
 
-def manage_issues(data: dict) -> dict:
+def process_event(
+    event_type: str, data: dict, endpoint: str, api_id: Optional[int] = None
+) -> dict:
+    """Dispatch an event to its handler, for every target or the one it was
+    parked for.
+    """
+    event = Event(event_type, data, api_id)
+    response = {"status": "skipped"}
+    if event_type == "ping":
+        response = {"msg": "pong"}
+    elif event_type == "issues":
+        response = manage_issues(event, endpoint)
+    elif event_type == "issue_comment":
+        response = manage_issue_comment(event, endpoint)
+    return response
+
+
+def manage_issues(event: Event, endpoint: str) -> dict:
     """Manage issues received."""
+    data = event.data
     action = data["action"]
     repo_dict = data["repository"]
     issue_dict = data["issue"]
     repo_url = urlparse(repo_dict["html_url"])
-    repo_name = repo_dict.get("full_name", "").split("/")[-1]
-
-    apidb = ApiModel.query.all()
-    apis = [
-        api for api in apidb if urlparse(api.url).hostname != repo_url.hostname
-    ]
-
-    response = {}
-    for api in apis:
-        client = api.get_client()
-        response[api.name] = {"status": "issues skipped"}
-
-        try:
-            project = client.get_project_from_name(repo_name)
-
-            if project:
-                issue = project.get_issue_from_title(issue_dict["title"])
-                if action == "opened" and not issue:
-                    project.create_issue(
-                        issue_dict["title"], issue_dict["body"]
-                    )
-                    response[api.name]["status"] = "done"
-                elif action == "reopened" and issue:
-                    issue.state = "reopen"
-                    response[api.name]["status"] = "done"
-                elif action == "closed" and issue:
-                    issue.state = "close"
-                    response[api.name]["status"] = "done"
-        except Exception as err:
-            current_app.logger.error(str(err))
-            response[api.name] = {"status": "error"}
-
-    return response
-
-
-def manage_issue_comment(data: dict) -> dict:
+    repo_name = get_target_path(endpoint, repo_dict.get("full_name", ""))
+    source = SourceIssue(
+        repo_url.hostname, repo_dict["full_name"], issue_dict["number"]
+    )
+    if action in ("opened", "reopened", "closed") and echoes.is_echo(
+        source.host,
+        source.project,
+        "issue",
+        source.number,
+        issue_state(action),
+    ):
+        return {"status": "echo skipped"}
+
+    targets = routing_table.get_targets(repo_url.hostname)
+
+    def sync(target: Target) -> dict:
+        client = target.api.get_client()
+        target_host = target.host
+        response = {"status": "issues skipped"}
+
+        project = client.get_project_from_name(repo_name)
+
+        if project:
+            issue = find_issue(
+                source, project, target_host, issue_dict["title"]
+            )
+            if action == "opened" and not issue:
+                issue = project.create_issue(
+                    issue_dict["title"], issue_dict["body"]
+                )
+                link_issue(source, project, target_host, issue)
+                response["status"] = "done"
+            elif action == "reopened" and issue:
+                issue.state = "reopen"
+                response["status"] = "done"
+            elif action == "closed" and issue:
+                issue.state = "close"
+                response["status"] = "done"
+
+            if response["status"] == "done":
+                echoes.record(
+                    target_host,
+                    project.path,
+                    "issue",
+                    issue.number,
+                    issue_state(action),
+                )
+
+        return response
+
+    return sync_targets(endpoint, targets, sync, event)
+
+
+def manage_issue_comment(event: Event, endpoint: str) -> dict:
     """Manage issue comments."""
+    data = event.data
     action = data["action"]
     repo_dict = data["repository"]
     issue_dict = data["issue"]
     comment_dict = data["comment"]
     repo_url = urlparse(repo_dict["html_url"])
-    repo_name = repo_dict.get("full_name", "").split("/")[-1]
+    repo_name = get_target_path(endpoint, repo_dict.get("full_name", ""))
+    source = SourceComment(
+        SourceIssue(
+            repo_url.hostname, repo_dict["full_name"], issue_dict["number"]
+        ),
+        comment_dict["id"],
+    )
     content = comment_dict["body"]
     if "body" in data.get("changes", {}):
         content = data["changes"]["body"]["from"]
+    if action in ("created", "edited") and echoes.is_echo(
+        source.issue.host,
+        source.issue.project,
+        "comment",
+        source.id,
+        comment_dict["body"],
+    ):
+        return {"status": "echo skipped"}
+
+    targets = routing_table.get_targets(repo_url.hostname)
+
+    def sync(target: Target) -> dict:
+        client = target.api.get_client()
+        target_host = target.host
+        response = {"status": "issue comment skipped"}
+
+        project = client.get_project_from_name(repo_name)
+
+        if project:
+            issue = find_issue(
+                source.issue, project, target_host, issue_dict["title"]
+            )
+
+            if issue:
+                comment = find_comment(
+                    source, project, issue, target_host, content
+                )
+                if action == "created" and not comment:
+                    comment = issue.create_comment(comment_dict["body"])
+                    echoes.record(
+                        target_host,
+                        project.path,
+                        "comment",
+                        comment.id,
+                        comment_dict["body"],
+                    )
+                    link_comment(
+                        source,
+                        project,
+                        issue,
+                        target_host,
+                        comment,
+                        comment_dict["body"],
+                    )
+                    response["status"] = "done"
+                elif action == "edited" and comment:
+                    comment.body = comment_dict["body"]
+                    echoes.record(
+                        target_host,
+                        project.path,
+                        "comment",
+                        comment.id,
+                        comment_dict["body"],
+                    )
+                    link_comment(
+                        source,
+                        project,
+                        issue,
+                        target_host,
+                        comment,
+                        comment_dict["body"],
+                    )
+                    response["status"] = "done"
+                elif action == "deleted" and comment:
+                    comment.delete()
+                    unlink_comment(source, target_host)
+                    response["status"] = "done"
 
-    apidb = ApiModel.query.all()
-    apis = [
-        api for api in apidb if urlparse(api.url).hostname != repo_url.hostname
-    ]
-
-    response = {}
-    for api in apis:
-        client = api.get_client()
-        response[api.name] = {"status": "issue comment skipped"}
-
-        try:
-            project = client.get_project_from_name(repo_name)
-
-            if project:
-                issue = project.get_issue_from_title(issue_dict["title"])
-
-                if issue:
-                    comment = issue.get_comment_from_body(content)
-                    if action == "created" and not comment:
-                        issue.create_comment(comment_dict["body"])
-                        response[api.name]["status"] = "done"
-                    elif action == "edited" and comment:
-                        comment.body = comment_dict["body"]
-                        response[api.name]["status"] = "done"
-                    elif action == "deleted" and comment:
-                        comment.delete()
-                        response[api.name]["status"] = "done"
-        except Exception as err:
-            current_app.logger.error(str(err))
-            response[api.name] = {"status": "error"}
+        return response
 
-    return response
+    return sync_targets(endpoint, targets, sync, event)
 
 
 @github_hook.after_request
 def save_request(response: Response):
     """Save request in db."""
     if request.url_rule:
-        endpoint = request.url_rule.rule
-        hook = HookModel.query.filter_by(endpoint=endpoint).first_or_404()
-
-        request_model = RequestModel(
+        hook = get_current_hook()
+        delivery_id = request.headers.get(DELIVERY_HEADER)
+        status = response.status_code
+        if status == 200 and g.get("sync_failed"):
+            status = SYNC_FAILED_STATUS
+        if g.get("duplicate_delivery"):
+            # kept in headers, but duplicates must not count as synced
+            delivery_id = None
+        elif delivery_id and status != 200:
+            # only synced deliveries are kept, queued ones are looked up
+            # among jobs
+            deliveries.forget(delivery_id)
+        request_log.add(
             hook_id=hook.id,
+            delivery_id=delivery_id,
             headers=json.dumps(
                 {key: value for key, value in request.headers.items()}
             ),
             body=request.data.decode("utf-8"),
-            status=response.status_code,
+            status=status,
             response=response.data.decode("utf-8"),
         )
-        db.session.add(request_model)
-        db.session.commit()
 
     return response
@@ -0,0 +1,79 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import NamedTuple, Optional
+
+from flask import Flask, current_app
+
+from anyrepo.cache import TTLCache
+from anyrepo.models.hook import HookModel, HookType
+
+
+class HookEntry(NamedTuple):
+    """What a webhook delivery needs to know about its hook."""
+
+    id: int
+    hook_type: HookType
+    secret: str
+
+
+class HookRegistry:
+    """Process-level cache of hooks by endpoint, with decrypted secrets.
+
+    Entries expire after the HOOK_REGISTRY_TTL config value (300 seconds by
+    default) so secrets changed by another process are picked up.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        ttl = app.config.get("HOOK_REGISTRY_TTL", 300)
+        app.extensions["anyrepo_hooks"] = TTLCache(maxsize=1024, ttl=ttl)
+
+    @property
+    def _cache(self) -> TTLCache:
+        return current_app.extensions["anyrepo_hooks"]
+
+    def _register(self, hook: HookModel) -> HookEntry:
+        entry = HookEntry(hook.id, hook.hook_type, hook.get_secret())
+        self._cache.set(hook.endpoint, entry)
+        return entry
+
+    def load(self):
+        """Register every hook of the database."""
+        for hook in HookModel.query.all():
+            self._register(hook)
+
+    def get(self, endpoint: str) -> Optional[HookEntry]:
+        """Get a registered hook, loading it from the database if needed."""
+        found, entry = self._cache.lookup(endpoint)
+        if found:
+            return entry
+
+        hook = HookModel.query.filter_by(endpoint=endpoint).one_or_none()
+        return None if hook is None else self._register(hook)
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        """Drop a registered hook, or every one if no endpoint is given."""
+        if endpoint is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(endpoint)
+
+
+hook_registry = HookRegistry()
@@ -0,0 +1,177 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import atexit
+import threading
+import weakref
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+from uuid import uuid4
+
+from flask import Flask, current_app
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+
+from anyrepo.models import db
+from anyrepo.models.request import RequestCounterModel, RequestModel
+from anyrepo.models.search import search_index
+from anyrepo.models.traffic import TrafficModel
+
+_writers: "weakref.WeakSet[RequestLogWriter]" = weakref.WeakSet()
+
+
+class RequestLogWriter:
+    """Buffer of webhook requests inserted in the database in batches.
+
+    Rows are written once batch_size of them are buffered or flush_interval
+    seconds after the first one, in a single transaction outside of the
+    request session which also updates the request counters and traffic
+    rollups. Traffic counts are aggregated in memory until then.
+    """
+
+    def __init__(self, app: Flask, batch_size: int, flush_interval: float):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def add(self, row: Dict[str, Any]):
+        """Buffer a request table row."""
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.batch_size
+            if not full:
+                self._schedule()
+
+        if full:
+            self.flush()
+
+    def add_counts(self, counts: Counter):
+        """Buffer traffic counts."""
+        with self._lock:
+            self._counts.update(counts)
+            self._schedule()
+
+    def flush(self):
+        """Write every buffered row."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            counts, self._counts = self._counts, Counter()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not rows and not counts:
+            return
+
+        counts.update(TrafficModel.count_requests(rows))
+        try:
+            try:
+                self._write(rows, counts)
+            except IntegrityError:
+                # another process created one of the counters first
+                self._write(rows, counts)
+        except Exception:
+            self.app.logger.exception(f"Could not save {len(rows)} requests")
+
+    def _write(self, rows: List[Dict[str, Any]], counts: Counter):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                if rows:
+                    connection.execute(RequestModel.__table__.insert(), rows)
+                    RequestCounterModel.increment(connection, rows)
+                    self._index(connection, rows)
+                TrafficModel.increment(connection, counts)
+
+    def _index(self, connection: Connection, rows: List[Dict[str, Any]]):
+        if not search_index.enabled:
+            return
+
+        table = RequestModel.__table__
+        ids = dict(
+            connection.execute(
+                select(table.c.slug, table.c.id).where(
+                    table.c.slug.in_([row["slug"] for row in rows])
+                )
+            ).fetchall()
+        )
+        search_index.add(
+            connection, ((ids[row["slug"]], row["body"]) for row in rows)
+        )
+
+
+class RequestLog:
+    """Write-behind log of webhook requests.
+
+    REQUEST_LOG_BATCH_SIZE (1 by default, writing each request on its own)
+    and REQUEST_LOG_FLUSH_INTERVAL (1 second by default) config values set
+    how long requests can stay buffered. Buffers are flushed on exit.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        writer = RequestLogWriter(
+            app,
+            app.config.get("REQUEST_LOG_BATCH_SIZE", 1),
+            app.config.get("REQUEST_LOG_FLUSH_INTERVAL", 1.0),
+        )
+        app.extensions["anyrepo_requests"] = writer
+        _writers.add(writer)
+
+    @property
+    def _writer(self) -> RequestLogWriter:
+        return current_app.extensions["anyrepo_requests"]
+
+    def add(self, **row: Any):
+        """Log a webhook request from its request table values."""
+        row.setdefault("slug", uuid4().hex)
+        row.setdefault("delivery_id", None)
+        row.setdefault("created_at", datetime.utcnow())
+        self._writer.add(row)
+
+    def add_outcomes(self, hook_id: int, outcomes: Mapping[int, str]):
+        """Count the sync statuses of an event by target API id."""
+        counts = TrafficModel.count_outcomes(
+            hook_id, outcomes, datetime.utcnow()
+        )
+        self._writer.add_counts(counts)
+
+    def flush(self):
+        """Write every buffered request."""
+        self._writer.flush()
+
+
+@atexit.register
+def _flush_all():
+    for writer in list(_writers):
+        writer.flush()
+
+
+request_log = RequestLog()
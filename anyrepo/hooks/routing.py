@@ -0,0 +1,94 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from flask import Flask, current_app
+from sqlalchemy.orm import Session
+
+from anyrepo.cache import TTLCache
+from anyrepo.models import db
+from anyrepo.models.api import ApiModel
+
+
+class Target(NamedTuple):
+    """Forge API events are synced to."""
+
+    name: str
+    host: str
+    api: ApiModel
+
+
+Routes = Tuple[List[Target], Dict[str, List[Target]]]
+
+
+class RoutingTable:
+    """Process-level table of the targets of events by source hostname.
+
+    The table is compiled from the API table on first use and kept until
+    an API is modified, or ROUTING_TABLE_TTL seconds (300 by default) so
+    changes made by another process are picked up.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        ttl = app.config.get("ROUTING_TABLE_TTL", 300)
+        app.extensions["anyrepo_routes"] = TTLCache(maxsize=1, ttl=ttl)
+
+    @property
+    def _cache(self) -> TTLCache:
+        return current_app.extensions["anyrepo_routes"]
+
+    def _compile(self) -> Routes:
+        # rows are loaded in their own session and detached, so they can be
+        # shared between requests and threads without being expired
+        session = Session(bind=db.engine)
+        try:
+            apis = session.query(ApiModel).order_by(ApiModel.id).all()
+        finally:
+            session.close()
+
+        targets = [
+            Target(api.name, urlparse(api.url).hostname, api) for api in apis
+        ]
+        routes = {
+            target.host: [
+                other for other in targets if other.host != target.host
+            ]
+            for target in targets
+        }
+        return targets, routes
+
+    def get_targets(self, source_host: str) -> List[Target]:
+        """Get the targets of an event from the source forge hostname."""
+        found, table = self._cache.lookup("routes")
+        if not found:
+            table = self._compile()
+            self._cache.set("routes", table)
+
+        targets, routes = table
+        return routes.get(source_host, targets)
+
+    def invalidate(self):
+        """Drop the compiled table."""
+        self._cache.clear()
+
+
+routing_table = RoutingTable()
@@ -0,0 +1,207 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Callable, List, NamedTuple
+
+from flask import current_app
+from sqlalchemy import Date, cast, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
+
+from anyrepo.models import db
+from anyrepo.models.request import RequestCounterModel, RequestModel
+from anyrepo.models.search import search_index
+
+
+class SchemaVersionModel(db.Model):
+    """Applied migrations table."""
+
+    __tablename__ = "schema_version"
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String, nullable=False)
+    applied_at = db.Column(db.DateTime, server_default=func.now())
+
+
+class Migration(NamedTuple):
+    """Schema change applied once per database.
+
+    db.create_all creates missing tables with their current schema but never
+    alters existing ones, which migrations bring up to date. They must be
+    idempotent, as they also run on databases just created.
+    """
+
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def create_index(connection: Connection, table: str, name: str, *columns):
+    """Create an index unless it exists."""
+    existing = inspect(connection).get_indexes(table)
+    if name not in {index["name"] for index in existing}:
+        connection.execute(
+            text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+        )
+
+
+def add_request_indexes(connection: Connection):
+    create_index(
+        connection,
+        "request",
+        "ix_request_hook_created",
+        "hook_id",
+        "created_at",
+    )
+    create_index(
+        connection,
+        "request",
+        "ix_request_status_created",
+        "status",
+        "created_at",
+    )
+
+
+def backfill_request_counters(connection: Connection):
+    counters = RequestCounterModel.__table__
+    counters.create(connection, checkfirst=True)
+    if connection.execute(select(func.count()).select_from(counters)).scalar():
+        return
+
+    requests = RequestModel.__table__
+    if connection.dialect.name == "sqlite":
+        day = func.date(requests.c.created_at)
+    else:
+        day = cast(requests.c.created_at, Date)
+    connection.execute(
+        counters.insert().from_select(
+            ["hook_id", "day", "status", "count"],
+            select(
+                requests.c.hook_id, day, requests.c.status, func.count()
+            ).group_by(requests.c.hook_id, day, requests.c.status),
+        )
+    )
+
+
+def index_request_bodies(connection: Connection):
+    if not search_index.create(connection):
+        return
+
+    # bodies are decompressed when read, so they are indexed by batches
+    requests = RequestModel.__table__
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(requests.c.id, requests.c.body)
+            .where(requests.c.id > last_id)
+            .order_by(requests.c.id)
+            .limit(1000)
+        ).fetchall()
+        if not rows:
+            return
+        search_index.add(connection, rows)
+        last_id = rows[-1][0]
+
+
+def add_request_delivery_id(connection: Connection):
+    columns = inspect(connection).get_columns("request")
+    if "delivery_id" not in {column["name"] for column in columns}:
+        connection.execute(
+            text("ALTER TABLE request ADD COLUMN delivery_id VARCHAR")
+        )
+    create_index(
+        connection, "request", "ix_request_delivery_id", "delivery_id"
+    )
+
+
+def add_job_target(connection: Connection):
+    columns = {
+        column["name"] for column in inspect(connection).get_columns("job")
+    }
+    if "api_id" not in columns:
+        connection.execute(
+            text(
+                "ALTER TABLE job ADD COLUMN api_id INTEGER "
+                "REFERENCES api (id) ON DELETE CASCADE"
+            )
+        )
+    if "scheduled_at" not in columns:
+        connection.execute(
+            text("ALTER TABLE job ADD COLUMN scheduled_at TIMESTAMP")
+        )
+
+
+def add_job_delivery_id(connection: Connection):
+    columns = inspect(connection).get_columns("job")
+    if "delivery_id" not in {column["name"] for column in columns}:
+        connection.execute(
+            text("ALTER TABLE job ADD COLUMN delivery_id VARCHAR")
+        )
+    create_index(connection, "job", "ix_job_delivery_id", "delivery_id")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Index requests by hook and status", add_request_indexes),
+    Migration(2, "Count logged requests", backfill_request_counters),
+    Migration(3, "Index request bodies", index_request_bodies),
+    Migration(4, "Record request delivery ids", add_request_delivery_id),
+    Migration(5, "Park jobs for a target", add_job_target),
+    Migration(6, "Record job delivery ids", add_job_delivery_id),
+]
+
+
+def get_version() -> int:
+    """Get the version of the database schema."""
+    version = db.session.query(func.max(SchemaVersionModel.version)).scalar()
+    return version or 0
+
+
+def migrate() -> List[Migration]:
+    """Apply pending migrations, each in its own transaction, and return
+    them.
+    """
+    SchemaVersionModel.__table__.create(db.engine, checkfirst=True)
+    current = get_version()
+    db.session.commit()
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+
+        try:
+            with db.engine.begin() as connection:
+                # recorded first so concurrent processes fail fast on it
+                connection.execute(
+                    SchemaVersionModel.__table__.insert(),
+                    {
+                        "version": migration.version,
+                        "description": migration.description,
+                    },
+                )
+                migration.apply(connection)
+        except IntegrityError:
+            current_app.logger.info(
+                f"Migration {migration.version} applied by another process"
+            )
+            continue
+
+        current_app.logger.info(
+            f"Applied migration {migration.version}: {migration.description}"
+        )
+        applied.append(migration)
+    return applied
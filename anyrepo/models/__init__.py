@@ -15,6 +15,34 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+from typing import Mapping, Sequence, Tuple
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Table, and_
+from sqlalchemy.engine import Connection
 
 db = SQLAlchemy()
+
+
+def increment_counts(
+    connection: Connection,
+    table: Table,
+    columns: Sequence[str],
+    counts: Mapping[Tuple, int],
+):
+    """Add counts to the count column of the table rows identified by the
+    values of columns, creating missing rows.
+    """
+    for key, count in counts.items():
+        values = dict(zip(columns, key))
+        updated = connection.execute(
+            table.update()
+            .where(
+                and_(
+                    *(table.c[name] == value for name, value in values.items())
+                )
+            )
+            .values(count=table.c.count + count)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert(), {"count": count, **values})
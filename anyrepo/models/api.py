@@ -18,9 +18,13 @@ from enum import Enum
 from typing import Optional
 from uuid import uuid4
 
+from flask import current_app
+
 from anyrepo.api import API
 from anyrepo.api.github_api import GithubAPI
 from anyrepo.api.gitlab_api import GitlabAPI
+from anyrepo.api.http import http_pool
+from anyrepo.api.pool import client_pool, fingerprint
 from anyrepo.models import db
 from anyrepo.models.encryption import decrypt_data, encrypt_data
 
@@ -60,9 +64,30 @@ class ApiModel(db.Model):
         return decrypt_data(self.token_encrypted)
 
     def get_client(self) -> Optional[API]:
-        """Get API client."""
+        """Get API client, reusing the pooled one while the row is
+        unchanged.
+        """
+        key = (self.url, self.api_type, fingerprint(self.token_encrypted))
+        return client_pool.get(self.id, key, self._create_client)
+
+    def _create_client(self) -> Optional[API]:
+        options = {
+            "cache_size": current_app.config.get("PROJECT_CACHE_SIZE", 256),
+            "cache_ttl": current_app.config.get("PROJECT_CACHE_TTL", 300),
+            "negative_cache_ttl": current_app.config.get(
+                "PROJECT_CACHE_NEGATIVE_TTL", 60
+            ),
+            "rate_limit_reserve": current_app.config.get(
+                "RATE_LIMIT_RESERVE", 10
+            ),
+            "rate_limit_max_wait": current_app.config.get(
+                "RATE_LIMIT_MAX_WAIT", 60
+            ),
+            "session": http_pool.session(self.url),
+            "timeout": current_app.config.get("HTTP_TIMEOUT", 15),
+        }
         if self.api_type == ApiType.GITHUB:
-            return GithubAPI(self.url, self.get_token())
+            return GithubAPI(self.url, self.get_token(), **options)
         elif self.api_type == ApiType.GITLAB:
-            return GitlabAPI(self.url, self.get_token())
+            return GitlabAPI(self.url, self.get_token(), **options)
         return None
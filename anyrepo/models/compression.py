@@ -0,0 +1,163 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import zlib
+from base64 import b64decode, b64encode
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy.types import String, TypeDecorator
+
+from anyrepo.api.pool import fingerprint
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+MARKERS = ("zl:", "zs:")
+
+
+class Compressor:
+    """Compress text into a marked, base64 encoded string.
+
+    Values are stored as "<codec>:<dictionary id>:<data>" so they can be
+    read back whatever the current settings are, and values without a
+    marker (small ones, or written before compression) are read as is.
+    """
+
+    def __init__(
+        self,
+        codec: str = "zlib",
+        level: int = 6,
+        dictionary: Optional[bytes] = None,
+        min_size: int = 256,
+    ):
+        self.codec = codec
+        self.level = level
+        self.dictionary = dictionary
+        self.dictionary_id = fingerprint(dictionary) if dictionary else ""
+        self.min_size = min_size
+
+    def _compress(self, data: bytes) -> str:
+        if self.codec == "zstd":
+            dict_data = None
+            if self.dictionary:
+                dict_data = zstandard.ZstdCompressionDict(self.dictionary)
+            compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=dict_data
+            )
+            return f"zs:{self.dictionary_id}:" + b64encode(
+                compressor.compress(data)
+            ).decode("ascii")
+
+        if self.dictionary:
+            compressobj = zlib.compressobj(self.level, zdict=self.dictionary)
+        else:
+            compressobj = zlib.compressobj(self.level)
+        compressed = compressobj.compress(data) + compressobj.flush()
+        return f"zl:{self.dictionary_id}:" + b64encode(compressed).decode(
+            "ascii"
+        )
+
+    def compress(self, value: str) -> str:
+        """Compress a value unless it would not get smaller."""
+        # values looking like compressed ones are always compressed so they
+        # are not mistaken for one when read
+        marked = value.startswith(MARKERS)
+        if not marked and (self.codec == "none" or len(value) < self.min_size):
+            return value
+
+        compressed = self._compress(value.encode("utf-8"))
+        return compressed if marked or len(compressed) < len(value) else value
+
+    def decompress(self, value: str) -> str:
+        """Get back a value stored by compress."""
+        if not value.startswith(MARKERS):
+            return value
+
+        codec, dictionary_id, encoded = value.split(":", 2)
+        if dictionary_id != self.dictionary_id:
+            raise ValueError(f"Unknown compression dictionary {dictionary_id}")
+
+        data = b64decode(encoded)
+        if codec == "zs":
+            if zstandard is None:
+                raise ValueError("zstandard is needed to read this value")
+            dict_data = None
+            if self.dictionary:
+                dict_data = zstandard.ZstdCompressionDict(self.dictionary)
+            decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+            return decompressor.decompress(data).decode("utf-8")
+
+        if self.dictionary:
+            decompressobj = zlib.decompressobj(zdict=self.dictionary)
+        else:
+            decompressobj = zlib.decompressobj()
+        data = decompressobj.decompress(data) + decompressobj.flush()
+        return data.decode("utf-8")
+
+
+class Compression:
+    """Per-app compression settings of logged requests.
+
+    REQUEST_COMPRESSION is "zlib" (default), "zstd" or "none",
+    REQUEST_COMPRESSION_LEVEL its level and REQUEST_COMPRESSION_DICT the
+    path of a dictionary trained on sample payloads. Values compressed
+    with a dictionary can only be read with the same one.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        dictionary = None
+        path = app.config.get("REQUEST_COMPRESSION_DICT")
+        if path:
+            with open(path, "rb") as fi:
+                dictionary = fi.read()
+
+        app.extensions["anyrepo_compression"] = Compressor(
+            app.config.get("REQUEST_COMPRESSION", "zlib"),
+            app.config.get("REQUEST_COMPRESSION_LEVEL", 6),
+            dictionary,
+            app.config.get("REQUEST_COMPRESSION_MIN_SIZE", 256),
+        )
+
+    @property
+    def compressor(self) -> Compressor:
+        return current_app.extensions["anyrepo_compression"]
+
+
+compression = Compression()
+
+
+class CompressedString(TypeDecorator):
+    """String column compressed in the database."""
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compression.compressor.compress(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return compression.compressor.decompress(value)
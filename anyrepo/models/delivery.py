@@ -0,0 +1,27 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from anyrepo.models import db
+
+
+class DeliveryModel(db.Model):
+    """Ids of the webhook deliveries being processed."""
+
+    __tablename__ = "delivery"
+
+    id = db.Column(db.Integer, primary_key=True)
+    delivery_id = db.Column(db.String, nullable=False, unique=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
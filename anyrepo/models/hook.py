@@ -16,14 +16,13 @@
 
 
 from enum import Enum
-from typing import TYPE_CHECKING, List
 from uuid import uuid4
 
+from sqlalchemy.orm import Query
+
 from anyrepo.models import db
 from anyrepo.models.encryption import decrypt_data, encrypt_data
-
-if TYPE_CHECKING:
-    from anyrepo.models.request import RequestModel  # noqa: F401
+from anyrepo.models.request import RequestModel
 
 
 class HookType(Enum):
@@ -46,7 +45,7 @@ class HookModel(db.Model):
     hook_type = db.Column(db.Enum(HookType), nullable=False, name="type")
     secret_encrypted = db.Column(db.LargeBinary, nullable=False, name="secret")
 
-    requests = db.relationship("RequestModel", backref="hook", lazy=True)
+    requests = db.relationship("RequestModel", backref="hook", lazy="dynamic")
 
     def set_secret(self, secret_value: str):
         """Encrypt secret using app secret key and store it into
@@ -59,11 +58,11 @@ class HookModel(db.Model):
         return decrypt_data(self.secret_encrypted)
 
     @property
-    def good_requests(self) -> List["RequestModel"]:
-        """Get good requests list."""
-        return [request for request in self.requests if request.status == 200]
+    def good_requests(self) -> Query:
+        """Get good requests query."""
+        return self.requests.filter(RequestModel.succeeded)
 
     @property
-    def bad_requests(self) -> List["RequestModel"]:
-        """Get bad requests list."""
-        return [request for request in self.requests if request.status != 200]
+    def bad_requests(self) -> Query:
+        """Get bad requests query."""
+        return self.requests.filter(~RequestModel.succeeded)
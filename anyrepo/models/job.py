@@ -0,0 +1,61 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from enum import Enum
+from uuid import uuid4
+
+from sqlalchemy.sql import func
+
+from anyrepo.models import db
+
+
+class JobStatus(Enum):
+    """Job processing states."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobModel(db.Model):
+    """Webhook event queue table."""
+
+    __tablename__ = "job"
+
+    id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(
+        db.String, nullable=False, default=lambda: uuid4().hex, unique=True
+    )
+    hook_id = db.Column(db.Integer, db.ForeignKey("hook.id"), nullable=False)
+    delivery_id = db.Column(db.String, index=True)
+    # target the event was parked for, every target when null
+    api_id = db.Column(db.Integer, db.ForeignKey("api.id", ondelete="CASCADE"))
+    event_type = db.Column(db.String, nullable=False)
+    payload = db.Column(db.String, nullable=False)
+    status = db.Column(
+        db.Enum(JobStatus),
+        nullable=False,
+        default=JobStatus.PENDING,
+        index=True,
+    )
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    response = db.Column(db.String)
+    started_at = db.Column(db.DateTime)
+    scheduled_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, server_default=func.now())
+
+    hook = db.relationship("HookModel")
@@ -0,0 +1,175 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from hashlib import sha256
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import func
+
+from anyrepo.models import db
+
+
+def body_hash(body: str) -> str:
+    """Hash of a comment body."""
+    return sha256(body.encode("utf-8")).hexdigest()
+
+
+class IssueLinkModel(db.Model):
+    """Links between an issue and its mirror on another forge."""
+
+    __tablename__ = "issue_link"
+    __table_args__ = (
+        db.Index(
+            "ix_issue_link_source",
+            "source_host",
+            "source_project",
+            "source_number",
+        ),
+        db.Index(
+            "ix_issue_link_target",
+            "target_host",
+            "target_project",
+            "target_number",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    source_host = db.Column(db.String, nullable=False)
+    source_project = db.Column(db.String, nullable=False)
+    source_number = db.Column(db.Integer, nullable=False)
+    target_host = db.Column(db.String, nullable=False)
+    target_project = db.Column(db.String, nullable=False)
+    target_number = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, server_default=func.now())
+
+    @classmethod
+    def get_linked_number(
+        cls,
+        host: str,
+        project: str,
+        number: int,
+        target_host: str,
+        target_project: str,
+    ) -> Optional[int]:
+        """Get the number of the issue linked to the given one in the target
+        project, whichever side of the link the given issue is on.
+        """
+        link = cls.query.filter_by(
+            source_host=host,
+            source_project=project,
+            source_number=number,
+            target_host=target_host,
+            target_project=target_project,
+        ).first()
+        if link:
+            return link.target_number
+
+        link = cls.query.filter_by(
+            target_host=host,
+            target_project=project,
+            target_number=number,
+            source_host=target_host,
+            source_project=target_project,
+        ).first()
+        if link:
+            return link.source_number
+
+        return None
+
+
+class CommentLinkModel(db.Model):
+    """Links between an issue comment and its mirror on another forge."""
+
+    __tablename__ = "comment_link"
+    __table_args__ = (
+        db.Index("ix_comment_link_source", "source_host", "source_comment"),
+        db.Index("ix_comment_link_target", "target_host", "target_comment"),
+        db.Index(
+            "ix_comment_link_target_issue",
+            "target_host",
+            "target_project",
+            "target_issue",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    source_host = db.Column(db.String, nullable=False)
+    source_project = db.Column(db.String, nullable=False)
+    source_issue = db.Column(db.Integer, nullable=False)
+    source_comment = db.Column(db.Integer, nullable=False)
+    target_host = db.Column(db.String, nullable=False)
+    target_project = db.Column(db.String, nullable=False)
+    target_issue = db.Column(db.Integer, nullable=False)
+    target_comment = db.Column(db.Integer, nullable=False)
+    body_hash = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.DateTime, server_default=func.now())
+
+    @classmethod
+    def get_linked_id(
+        cls, host: str, comment_id: int, target_host: str, target_project: str
+    ) -> Optional[int]:
+        """Get the id of the comment linked to the given one in the target
+        project, whichever side of the link the given comment is on.
+        """
+        link = cls.query.filter_by(
+            source_host=host,
+            source_comment=comment_id,
+            target_host=target_host,
+            target_project=target_project,
+        ).first()
+        if link:
+            return link.target_comment
+
+        link = cls.query.filter_by(
+            target_host=host,
+            target_comment=comment_id,
+            source_host=target_host,
+            source_project=target_project,
+        ).first()
+        if link:
+            return link.source_comment
+
+        return None
+
+    @classmethod
+    def get_id_from_body(
+        cls, target_host: str, target_project: str, issue: int, body: str
+    ) -> Optional[int]:
+        """Get the id of a linked comment of the target issue from the hash
+        of its body.
+        """
+        digest = body_hash(body)
+        link = cls.query.filter(
+            cls.body_hash == digest,
+            or_(
+                and_(
+                    cls.target_host == target_host,
+                    cls.target_project == target_project,
+                    cls.target_issue == issue,
+                ),
+                and_(
+                    cls.source_host == target_host,
+                    cls.source_project == target_project,
+                    cls.source_issue == issue,
+                ),
+            ),
+        ).first()
+        if link is None:
+            return None
+        if link.target_host == target_host:
+            return link.target_comment
+        return link.source_comment
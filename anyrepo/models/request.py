@@ -14,25 +14,142 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import uuid4
 
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Query
 from sqlalchemy.sql import func
 
-from anyrepo.models import db
+from anyrepo.models import db, increment_counts
+from anyrepo.models.compression import CompressedString
+
+# status logged for deliveries which passed validation but failed to sync,
+# while forges are answered with a 200
+SYNC_FAILED_STATUS = 502
 
 
 class RequestModel(db.Model):
     """Request table."""
 
     __tablename__ = "request"
+    __table_args__ = (
+        db.Index("ix_request_hook_created", "hook_id", "created_at"),
+        db.Index("ix_request_status_created", "status", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     slug = db.Column(
         db.String, nullable=False, default=lambda: uuid4().hex, unique=True
     )
-    headers = db.Column(db.String, nullable=False)
-    body = db.Column(db.String, nullable=False)
-    response = db.Column(db.String, nullable=False)
+    delivery_id = db.Column(db.String, index=True)
+    headers = db.deferred(
+        db.Column(CompressedString, nullable=False), group="payload"
+    )
+    body = db.deferred(
+        db.Column(CompressedString, nullable=False), group="payload"
+    )
+    response = db.deferred(
+        db.Column(CompressedString, nullable=False), group="payload"
+    )
     status = db.Column(db.Integer, nullable=False)
     hook_id = db.Column(db.Integer, db.ForeignKey("hook.id"), nullable=False)
     created_at = db.Column(db.DateTime, server_default=func.now())
+
+    @hybrid_property
+    def succeeded(self) -> bool:
+        """Whether the delivery was accepted (processed or queued)."""
+        return 200 <= self.status < 300
+
+    @succeeded.expression
+    def succeeded(cls):
+        return cls.status.between(200, 299)
+
+    @hybrid_property
+    def replayable(self) -> bool:
+        """Whether the delivery passed validation, so it can be replayed."""
+        return self.succeeded or self.status == SYNC_FAILED_STATUS
+
+    @replayable.expression
+    def replayable(cls):
+        return or_(cls.succeeded, cls.status == SYNC_FAILED_STATUS)
+
+    @property
+    def cursor(self) -> str:
+        """Position of the request in pages, newest first."""
+        return f"{self.created_at.isoformat()}_{self.id}"
+
+
+class RequestCounterModel(db.Model):
+    """Number of requests logged per hook, day and status."""
+
+    __tablename__ = "request_counter"
+    __table_args__ = (db.UniqueConstraint("hook_id", "day", "status"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    hook_id = db.Column(db.Integer, db.ForeignKey("hook.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    status = db.Column(db.Integer, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @hybrid_property
+    def succeeded(self) -> bool:
+        """Whether the counted deliveries were accepted."""
+        return 200 <= self.status < 300
+
+    @succeeded.expression
+    def succeeded(cls):
+        return cls.status.between(200, 299)
+
+    @classmethod
+    def increment(cls, connection: Connection, rows: Iterable[Dict[str, Any]]):
+        """Count request table rows being inserted with connection."""
+        counts = Counter(
+            (row["hook_id"], row["created_at"].date(), row["status"])
+            for row in rows
+        )
+        increment_counts(
+            connection, cls.__table__, ("hook_id", "day", "status"), counts
+        )
+
+    @classmethod
+    def get_total(cls, succeeded: bool) -> int:
+        """Get the number of requests ever logged, good or bad ones."""
+        condition = cls.succeeded if succeeded else ~cls.succeeded
+        total = db.session.query(func.sum(cls.count)).filter(condition)
+        return total.scalar() or 0
+
+
+def get_requests_page(
+    query: Query, cursor: Optional[str] = None, size: int = 50
+) -> Tuple[List[RequestModel], Optional[str]]:
+    """Get the requests following cursor, newest first, and the cursor of
+    the next page if any.
+
+    Pages are sought by (created_at, id) instead of offset, so the index on
+    them keeps every page as fast as the first one.
+    """
+    if cursor:
+        created_at, _, id_ = cursor.rpartition("_")
+        created_at, id_ = datetime.fromisoformat(created_at), int(id_)
+        query = query.filter(
+            or_(
+                RequestModel.created_at < created_at,
+                and_(
+                    RequestModel.created_at == created_at,
+                    RequestModel.id < id_,
+                ),
+            )
+        )
+
+    requests = (
+        query.order_by(RequestModel.created_at.desc(), RequestModel.id.desc())
+        .limit(size + 1)
+        .all()
+    )
+    next_cursor = requests[size - 1].cursor if len(requests) > size else None
+    return requests[:size], next_cursor
@@ -0,0 +1,161 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from typing import Iterable, List, Tuple
+
+from flask import current_app
+from sqlalchemy import bindparam, column, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from anyrepo.models import db
+from anyrepo.models.request import RequestModel
+
+TABLES = {"sqlite": "request_fts", "postgresql": "request_search"}
+
+
+class SearchIndex:
+    """Full-text index of logged request bodies.
+
+    SQLite uses a contentless FTS5 table and PostgreSQL a tsvector column
+    with a GIN index, both keyed by request id. Bodies are indexed in clear
+    since they are compressed in the request table. Other databases, or
+    REQUEST_SEARCH set to false, disable search.
+    """
+
+    def create(self, connection: Connection) -> bool:
+        """Create the index if possible, return whether it exists."""
+        dialect = connection.dialect.name
+        if not current_app.config.get("REQUEST_SEARCH", True):
+            return False
+
+        if dialect == "sqlite":
+            try:
+                connection.execute(
+                    text(
+                        "CREATE VIRTUAL TABLE IF NOT EXISTS request_fts "
+                        "USING fts5(body, content='')"
+                    )
+                )
+            except OperationalError:
+                current_app.logger.warning("SQLite has no FTS5 support")
+                return False
+            return True
+
+        if dialect == "postgresql":
+            connection.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS request_search ("
+                    "request_id INTEGER PRIMARY KEY "
+                    "REFERENCES request (id) ON DELETE CASCADE, "
+                    "document TSVECTOR NOT NULL)"
+                )
+            )
+            connection.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_request_search_document "
+                    "ON request_search USING GIN (document)"
+                )
+            )
+            return True
+        return False
+
+    @property
+    def enabled(self) -> bool:
+        """Whether requests are indexed."""
+        extensions = current_app.extensions
+        if "anyrepo_search" not in extensions:
+            table = TABLES.get(db.engine.dialect.name)
+            extensions["anyrepo_search"] = (
+                current_app.config.get("REQUEST_SEARCH", True)
+                and table is not None
+                and table in inspect(db.engine).get_table_names()
+            )
+        return extensions["anyrepo_search"]
+
+    def add(self, connection: Connection, bodies: Iterable[Tuple[int, str]]):
+        """Index request bodies by request id."""
+        params = [{"id": id_, "body": body} for id_, body in bodies]
+        if not params:
+            return
+
+        if connection.dialect.name == "sqlite":
+            statement = (
+                "INSERT INTO request_fts (rowid, body) VALUES (:id, :body)"
+            )
+        else:
+            statement = (
+                "INSERT INTO request_search (request_id, document) "
+                "VALUES (:id, to_tsvector('simple', :body))"
+            )
+        connection.execute(text(statement), params)
+
+    def remove(self, connection: Connection, ids: List[int]):
+        """Remove requests from the index by id."""
+        if not ids:
+            return
+
+        if connection.dialect.name != "sqlite":
+            connection.execute(
+                text("DELETE FROM request_search WHERE request_id IN :ids")
+                .bindparams(bindparam("ids", expanding=True))
+                .params(ids=ids)
+            )
+            return
+
+        # contentless tables need the indexed values to delete them, and
+        # deleting rows which were never indexed would corrupt them
+        indexed = connection.execute(
+            text("SELECT rowid FROM request_fts WHERE rowid IN :ids")
+            .bindparams(bindparam("ids", expanding=True))
+            .params(ids=ids)
+        ).fetchall()
+        if not indexed:
+            return
+
+        requests = RequestModel.__table__
+        bodies = connection.execute(
+            select(requests.c.id, requests.c.body).where(
+                requests.c.id.in_([row[0] for row in indexed])
+            )
+        )
+        connection.execute(
+            text(
+                "INSERT INTO request_fts (request_fts, rowid, body) "
+                "VALUES ('delete', :id, :body)"
+            ),
+            [{"id": id_, "body": body} for id_, body in bodies],
+        )
+
+    def match(self, terms: str):
+        """Get a query of the ids of requests whose body has every term."""
+        if db.engine.dialect.name == "sqlite":
+            words: List[str] = terms.split()
+            terms = " ".join('"' + w.replace('"', '""') + '"' for w in words)
+            statement = (
+                "SELECT rowid FROM request_fts WHERE request_fts MATCH :terms"
+            )
+            id_column = column("rowid")
+        else:
+            statement = (
+                "SELECT request_id FROM request_search "
+                "WHERE document @@ plainto_tsquery('simple', :terms)"
+            )
+            id_column = column("request_id")
+        return text(statement).bindparams(terms=terms).columns(id_column)
+
+
+search_index = SearchIndex()
@@ -0,0 +1,135 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import func
+
+from anyrepo.models import db, increment_counts
+from anyrepo.models.api import ApiModel
+
+EPOCH = datetime(1970, 1, 1)
+MINUTE = 60
+HOUR = 3600
+PERIODS = (MINUTE, HOUR)
+
+TrafficKey = Tuple[int, datetime, int, Optional[int], str]
+
+
+def get_bucket(at: datetime, period: int) -> datetime:
+    """Get the start of the period at falls in."""
+    seconds = int((at - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % period)
+
+
+class TrafficModel(db.Model):
+    """Webhook deliveries and sync outcomes per minute and hour.
+
+    Rows without an api count deliveries by HTTP status, the others count
+    the sync statuses of the target API.
+    """
+
+    __tablename__ = "traffic"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "period", "bucket", "hook_id", "api_id", "outcome"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.Integer, nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)
+    hook_id = db.Column(db.Integer, db.ForeignKey("hook.id"), nullable=False)
+    api_id = db.Column(db.Integer, db.ForeignKey("api.id"), nullable=True)
+    outcome = db.Column(db.String, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def count_requests(rows: Iterable[Dict[str, Any]]) -> Counter:
+        """Get the traffic counts of request table rows."""
+        return Counter(
+            (
+                period,
+                get_bucket(row["created_at"], period),
+                row["hook_id"],
+                None,
+                str(row["status"]),
+            )
+            for row in rows
+            for period in PERIODS
+        )
+
+    @staticmethod
+    def count_outcomes(
+        hook_id: int, outcomes: Mapping[int, str], at: datetime
+    ) -> Counter:
+        """Get the traffic counts of sync statuses by API id."""
+        return Counter(
+            (period, get_bucket(at, period), hook_id, api_id, outcome)
+            for api_id, outcome in outcomes.items()
+            for period in PERIODS
+        )
+
+    @classmethod
+    def increment(
+        cls, connection: Connection, counts: Mapping[TrafficKey, int]
+    ):
+        """Add traffic counts with connection."""
+        columns = ("period", "bucket", "hook_id", "api_id", "outcome")
+        increment_counts(connection, cls.__table__, columns, counts)
+
+    @classmethod
+    def get_deliveries(
+        cls, now: datetime, size: int = 60
+    ) -> List[Tuple[datetime, int, int]]:
+        """Get the (minute, good, bad) deliveries of the last size
+        minutes.
+        """
+        start = get_bucket(now, MINUTE) - timedelta(minutes=size - 1)
+        rows = (
+            db.session.query(cls.bucket, cls.outcome, func.sum(cls.count))
+            .filter(
+                cls.period == MINUTE,
+                cls.bucket >= start,
+                cls.api_id.is_(None),
+            )
+            .group_by(cls.bucket, cls.outcome)
+        )
+        series = {
+            start + timedelta(minutes=index): [0, 0] for index in range(size)
+        }
+        for bucket, outcome, count in rows:
+            if bucket in series:
+                series[bucket][0 if outcome.startswith("2") else 1] += count
+        return [(bucket, good, bad) for bucket, (good, bad) in series.items()]
+
+    @classmethod
+    def get_outcomes(cls, since: datetime) -> Dict[str, Dict[str, int]]:
+        """Get the sync statuses of every target API since a time."""
+        rows = (
+            db.session.query(ApiModel.name, cls.outcome, func.sum(cls.count))
+            .join(ApiModel, ApiModel.id == cls.api_id)
+            .filter(cls.period == HOUR, cls.bucket >= get_bucket(since, HOUR))
+            .group_by(ApiModel.name, cls.outcome)
+            .order_by(ApiModel.name, cls.outcome)
+        )
+        outcomes: Dict[str, Dict[str, int]] = {}
+        for name, outcome, count in rows:
+            outcomes.setdefault(name, {})[outcome] = count
+        return outcomes
@@ -0,0 +1,140 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy.orm import Query, undefer_group
+
+from anyrepo.hooks import failed
+from anyrepo.models.hook import HookType
+from anyrepo.models.request import RequestModel
+from anyrepo.worker import HANDLERS
+
+EVENT_HEADERS: Dict[HookType, str] = {
+    HookType.GITHUB: "X-GitHub-Event",
+    HookType.GITLAB: "X-Gitlab-Event",
+}
+
+
+class RateLimiter:
+    """Space calls to at most rate per second across threads, no limit
+    when rate is 0.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+def replay_request(request_model: RequestModel) -> dict:
+    """Dispatch a logged request to its hook event handler again.
+
+    Signatures are not checked again, so only replayable requests, which
+    passed validation when they were logged, must be replayed.
+    """
+    hook = request_model.hook
+    headers = json.loads(request_model.headers)
+    event_type = headers.get(EVENT_HEADERS[hook.hook_type], "ping")
+    data = json.loads(request_model.body)
+    return HANDLERS[hook.hook_type](event_type, data, hook.endpoint)
+
+
+def get_request_ids(query: Query) -> List[int]:
+    """Get the ids of the replayable requests of query, oldest first, so
+    events on the same issue are replayed in order as much as possible.
+    """
+    rows = (
+        query.filter(RequestModel.replayable)
+        .with_entities(RequestModel.id)
+        .order_by(None)
+        .order_by(RequestModel.created_at, RequestModel.id)
+    )
+    return [id_ for id_, in rows]
+
+
+def replay_requests(
+    app: Flask,
+    ids: List[int],
+    concurrency: Optional[int] = None,
+    rate: Optional[float] = None,
+) -> Counter:
+    """Replay logged requests and count them by outcome, "replayed" or
+    "failed".
+
+    REPLAY_CONCURRENCY (4 by default) requests are replayed at a time, at
+    most REPLAY_RATE (10 by default, 0 for no limit) per second.
+    """
+    if concurrency is None:
+        concurrency = app.config.get("REPLAY_CONCURRENCY", 4)
+    if rate is None:
+        rate = app.config.get("REPLAY_RATE", 10)
+    limiter = RateLimiter(rate)
+
+    def run(id_: int) -> str:
+        limiter.wait()
+        with app.app_context():
+            request_model = RequestModel.query.options(
+                undefer_group("payload")
+            ).get(id_)
+            if request_model is None or not request_model.replayable:
+                return "failed"
+            try:
+                response = replay_request(request_model)
+            except Exception as err:
+                current_app.logger.error(
+                    f"Could not replay request {request_model.slug}: {err}"
+                )
+                return "failed"
+            return "failed" if failed(response) else "replayed"
+
+    if concurrency <= 1 or len(ids) <= 1:
+        return Counter(run(id_) for id_ in ids)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        return Counter(ex.map(run, ids))
+
+
+def start_replay(app: Flask, ids: List[int]) -> threading.Thread:
+    """Replay logged requests in a background thread."""
+
+    def run():
+        outcomes = replay_requests(app, ids)
+        app.logger.info(
+            f"Replayed {outcomes['replayed']} requests, "
+            f"{outcomes['failed']} failed"
+        )
+
+    thread = threading.Thread(target=run, name="anyrepo-replay", daemon=True)
+    thread.start()
+    return thread
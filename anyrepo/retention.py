@@ -0,0 +1,178 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from flask import current_app
+from sqlalchemy import and_, not_
+
+from anyrepo.models import db
+from anyrepo.models.delivery import DeliveryModel
+from anyrepo.models.echo import EchoModel
+from anyrepo.models.hook import HookModel
+from anyrepo.models.job import JobModel, JobStatus
+from anyrepo.models.request import RequestModel
+from anyrepo.models.search import search_index
+from anyrepo.models.traffic import MINUTE, TrafficModel
+
+SUCCEEDED = RequestModel.succeeded
+
+
+def delete_rows(
+    model,
+    condition,
+    chunk_size: int,
+    before_delete: Optional[Callable[[List[int]], None]] = None,
+) -> int:
+    """Delete rows of model matching condition, chunk_size rows per
+    transaction so writers are never locked out for long.
+    """
+    deleted = 0
+    while True:
+        ids = [
+            id_
+            for (id_,) in db.session.query(model.id)
+            .filter(condition)
+            .order_by(model.id)
+            .limit(chunk_size)
+        ]
+        if not ids:
+            return deleted
+
+        if before_delete is not None:
+            before_delete(ids)
+        model.query.filter(model.id.in_(ids)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        deleted += len(ids)
+        if len(ids) < chunk_size:
+            return deleted
+
+
+def delete_requests(condition, chunk_size: int) -> int:
+    """Delete requests matching condition, and their search entries."""
+
+    def unindex(ids: List[int]):
+        if search_index.enabled:
+            search_index.remove(db.session.connection(), ids)
+
+    return delete_rows(RequestModel, condition, chunk_size, unindex)
+
+
+def get_expired_conditions(now: datetime) -> List:
+    """Get the conditions matching requests out of retention.
+
+    REQUEST_RETENTION_DAYS bounds the age of successful requests and
+    REQUEST_FAILURE_RETENTION_DAYS the age of failed ones, defaulting to the
+    former. REQUEST_RETENTION_COUNT caps the successful requests kept per
+    hook. Unset options keep requests forever.
+    """
+    config = current_app.config
+    days = config.get("REQUEST_RETENTION_DAYS")
+    failure_days = config.get("REQUEST_FAILURE_RETENTION_DAYS", days)
+    count = config.get("REQUEST_RETENTION_COUNT")
+
+    conditions = []
+    if days is not None:
+        expiry = now - timedelta(days=days)
+        conditions.append(and_(SUCCEEDED, RequestModel.created_at < expiry))
+    if failure_days is not None:
+        expiry = now - timedelta(days=failure_days)
+        conditions.append(
+            and_(not_(SUCCEEDED), RequestModel.created_at < expiry)
+        )
+    if count is not None:
+        for (hook_id,) in db.session.query(HookModel.id):
+            newest = RequestModel.query.filter(
+                RequestModel.hook_id == hook_id, SUCCEEDED
+            )
+            cutoff = (
+                newest.with_entities(RequestModel.id)
+                .order_by(RequestModel.id.desc())
+                .offset(count)
+                .limit(1)
+                .scalar()
+            )
+            if cutoff is not None:
+                conditions.append(
+                    and_(
+                        RequestModel.hook_id == hook_id,
+                        SUCCEEDED,
+                        RequestModel.id <= cutoff,
+                    )
+                )
+    return conditions
+
+
+def get_expired_job_conditions(now: datetime) -> List:
+    """Get the conditions matching processed jobs out of retention, done
+    ones as successful requests and failed ones as failed requests.
+    """
+    config = current_app.config
+    days = config.get("REQUEST_RETENTION_DAYS")
+    failure_days = config.get("REQUEST_FAILURE_RETENTION_DAYS", days)
+
+    conditions = []
+    for status, status_days in (
+        (JobStatus.DONE, days),
+        (JobStatus.FAILED, failure_days),
+    ):
+        if status_days is not None:
+            expiry = now - timedelta(days=status_days)
+            conditions.append(
+                and_(JobModel.status == status, JobModel.created_at < expiry)
+            )
+    return conditions
+
+
+def purge_requests(now: Optional[datetime] = None) -> int:
+    """Delete requests out of retention and return how many were.
+
+    Processed jobs out of retention are deleted too.
+    """
+    now = now or datetime.utcnow()
+    chunk_size = current_app.config.get("REQUEST_PURGE_CHUNK_SIZE", 1000)
+    deleted = sum(
+        delete_requests(condition, chunk_size)
+        for condition in get_expired_conditions(now)
+    )
+    if deleted:
+        current_app.logger.info(f"Purged {deleted} requests")
+
+    # jobs keep the payloads of queued deliveries too
+    jobs = sum(
+        delete_rows(JobModel, condition, chunk_size)
+        for condition in get_expired_job_conditions(now)
+    )
+    if jobs:
+        current_app.logger.info(f"Purged {jobs} jobs")
+
+    # hourly traffic is small enough to be kept, minutes only feed charts
+    days = current_app.config.get("TRAFFIC_MINUTE_RETENTION_DAYS", 2)
+    TrafficModel.query.filter(
+        TrafficModel.period == MINUTE,
+        TrafficModel.bucket < now - timedelta(days=days),
+    ).delete(synchronize_session=False)
+    EchoModel.query.filter(EchoModel.expires_at < now).delete(
+        synchronize_session=False
+    )
+    DeliveryModel.query.filter(DeliveryModel.expires_at < now).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return deleted
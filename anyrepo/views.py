@@ -14,11 +14,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from datetime import datetime, timedelta
 from typing import Optional
 
 import ldap
 from flask import (
     Blueprint,
+    Response,
     abort,
     current_app,
     flash,
@@ -28,16 +30,30 @@ from flask import (
     render_template,
     request,
     session,
+    stream_with_context,
     url_for,
 )
 from flask_login import LoginManager, current_user, login_required, login_user, logout_user
+from sqlalchemy.orm import undefer_group
 
+from anyrepo.api.circuit import circuit_breakers
+from anyrepo.api.pool import client_pool
+from anyrepo.export import FORMATS, export_requests, filter_requests
 from anyrepo.forms import ApiForm, HookForm, LoginForm, UserForm
+from anyrepo.hooks.registry import hook_registry
+from anyrepo.hooks.routing import routing_table
 from anyrepo.models import db
 from anyrepo.models.api import ApiModel
 from anyrepo.models.hook import HookModel
-from anyrepo.models.request import RequestModel
+from anyrepo.models.request import (
+    RequestCounterModel,
+    RequestModel,
+    get_requests_page,
+)
+from anyrepo.models.search import search_index
+from anyrepo.models.traffic import TrafficModel
 from anyrepo.models.user import User
+from anyrepo.replay import get_request_ids, replay_requests, start_replay
 
 admin = Blueprint("admin", __name__)
 login_manager = LoginManager()
@@ -92,8 +108,12 @@ def index():
     apicount = ApiModel.query.count()
     hookcount = HookModel.query.count()
     usercount = User.query.count()
-    badrequests = RequestModel.query.filter(RequestModel.status != 200).count()
-    goodrequests = RequestModel.query.filter_by(status=200).count()
+    badrequests = RequestCounterModel.get_total(succeeded=False)
+    goodrequests = RequestCounterModel.get_total(succeeded=True)
+    now = datetime.utcnow()
+    deliveries = TrafficModel.get_deliveries(now)
+    peak = max([good + bad for _, good, bad in deliveries] + [1])
+    outcomes = TrafficModel.get_outcomes(now - timedelta(days=1))
     return render_template(
         "index.html",
         apicount=apicount,
@@ -101,6 +121,9 @@ def index():
         usercount=usercount,
         badrequests=badrequests,
         goodrequests=goodrequests,
+        deliveries=deliveries,
+        peak=peak,
+        outcomes=outcomes,
     )
 
 
@@ -109,7 +132,25 @@ def index():
 def apis():
     """List all the registered APIs."""
     apis = ApiModel.query.all()
-    return render_template("apis.html", apis=apis)
+    stats = {}
+    budgets = {}
+    circuits = {}
+    for api in apis:
+        client = client_pool.peek(api.id)
+        if client is not None:
+            stats[api.id] = client.projects.stats
+            budgets[api.id] = client.budget.stats
+        breaker = circuit_breakers.peek(api.id)
+        if breaker is not None:
+            circuits[api.id] = breaker.state
+
+    return render_template(
+        "apis.html",
+        apis=apis,
+        stats=stats,
+        budgets=budgets,
+        circuits=circuits,
+    )
 
 
 @admin.route("/api/new/", defaults={"apiuuid": None}, methods=["GET", "POST"])
@@ -143,6 +184,8 @@ def api_edit(apiuuid=None):
                 msg = "API successfully created"
 
             db.session.commit()
+            client_pool.invalidate(api.id)
+            routing_table.invalidate()
             flash(msg, "success")
             return redirect(url_for("admin.apis"))
         else:
@@ -161,8 +204,13 @@ def api_delete():
         abort(404)
 
     api = ApiModel.query.filter_by(slug=apiuuid).first_or_404()
+    api_id = api.id
+    # sync outcomes reference the api
+    TrafficModel.query.filter_by(api_id=api_id).delete()
     db.session.delete(api)
     db.session.commit()
+    client_pool.invalidate(api_id)
+    routing_table.invalidate()
     flash("API successfully removed", "success")
     return redirect(url_for("admin.apis"))
 
@@ -187,6 +235,7 @@ def hook_edit(hookuuid):
         if form.validate_on_submit():
             hook.set_secret(form.secret.data)
             db.session.commit()
+            hook_registry.invalidate(hook.endpoint)
             flash("Hook secret successfully modified", "success")
             return redirect(url_for("admin.hook_detail", hookuuid=hook.slug))
         else:
@@ -203,8 +252,137 @@ def hook_edit(hookuuid):
 def hook_detail(hookuuid):
     """Show Hook detail."""
     hook = HookModel.query.filter_by(slug=hookuuid).first_or_404()
+    status = request.args.get("status")
+    query = {"good": hook.good_requests, "bad": hook.bad_requests}.get(
+        status, hook.requests
+    )
+    terms = request.args.get("q", "").strip()
+    searchable = search_index.enabled
+    if terms and searchable:
+        query = query.filter(RequestModel.id.in_(search_index.match(terms)))
+
+    size = current_app.config.get("HOOK_REQUESTS_PER_PAGE", 50)
+    try:
+        requests, cursor = get_requests_page(
+            query, request.args.get("after"), size
+        )
+    except ValueError:
+        abort(400)
+
     hostname = request.url_root[:-1]
-    return render_template("hookdetail.html", hook=hook, hostname=hostname)
+    return render_template(
+        "hookdetail.html",
+        hook=hook,
+        requests=requests,
+        status=status,
+        cursor=cursor,
+        terms=terms,
+        searchable=searchable,
+        hostname=hostname,
+    )
+
+
+@admin.route("/hook/replay/<hookuuid>/", methods=["POST"])
+@login_required
+def hook_replay(hookuuid):
+    """Replay the requests of a hook matching the detail page filters."""
+    hook = HookModel.query.filter_by(slug=hookuuid).first_or_404()
+    status = request.form.get("status")
+    query = {"good": hook.good_requests, "bad": hook.bad_requests}.get(
+        status, hook.requests
+    )
+    terms = request.form.get("q", "").strip()
+    if terms and search_index.enabled:
+        query = query.filter(RequestModel.id.in_(search_index.match(terms)))
+
+    ids = get_request_ids(query)
+    start_replay(current_app._get_current_object(), ids)
+    flash(f"Replaying {len(ids)} deliveries", "success")
+    return redirect(
+        url_for(
+            "admin.hook_detail",
+            hookuuid=hook.slug,
+            status=status or None,
+            q=terms or None,
+        )
+    )
+
+
+@admin.route("/request/replay/", methods=["POST"])
+@login_required
+def request_replay():
+    """Replay a request from its uuid."""
+    requestuuid = request.form.get("slug")
+    if not requestuuid:
+        abort(404)
+
+    request_model = RequestModel.query.filter_by(
+        slug=requestuuid
+    ).first_or_404()
+    hookuuid = request_model.hook.slug
+    if not request_model.replayable:
+        flash("Only validated deliveries can be replayed", "error")
+        return redirect(url_for("admin.hook_detail", hookuuid=hookuuid))
+
+    outcomes = replay_requests(
+        current_app._get_current_object(), [request_model.id], 1, 0
+    )
+    if outcomes["replayed"]:
+        flash("Delivery successfully replayed", "success")
+    else:
+        flash("Delivery replay failed", "error")
+    return redirect(url_for("admin.hook_detail", hookuuid=hookuuid))
+
+
+@admin.route("/requests/export/")
+@login_required
+def requests_export():
+    """Stream logged requests as NDJSON or CSV."""
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in FORMATS:
+        abort(400)
+
+    hook = None
+    if request.args.get("hook"):
+        hook = HookModel.query.filter_by(
+            slug=request.args["hook"]
+        ).first_or_404()
+
+    since = request.args.get("since")
+    until = request.args.get("until")
+    try:
+        query = filter_requests(
+            hook,
+            request.args.get("status"),
+            datetime.fromisoformat(since) if since else None,
+            datetime.fromisoformat(until) if until else None,
+        )
+    except ValueError:
+        abort(400)
+
+    filename = f"requests.{fmt}"
+    return Response(
+        stream_with_context(export_requests(query, fmt)),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+@admin.route("/request/<requestuuid>/")
+@login_required
+def request_detail(requestuuid):
+    """Get a request payload."""
+    request_model = (
+        RequestModel.query.filter_by(slug=requestuuid)
+        .options(undefer_group("payload"))
+        .first_or_404()
+    )
+    return jsonify(
+        headers=request_model.headers,
+        body=request_model.body,
+        response=request_model.response,
+        status=request_model.status,
+    )
 
 
 @admin.route("/users/")
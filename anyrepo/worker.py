@@ -0,0 +1,197 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import and_, or_
+
+from anyrepo.hooks import failed
+from anyrepo.hooks.github_hook import process_event as process_github_event
+from anyrepo.hooks.gitlab_hook import process_event as process_gitlab_event
+from anyrepo.models import db
+from anyrepo.models.hook import HookType
+from anyrepo.models.job import JobModel, JobStatus
+from anyrepo.retention import purge_requests
+
+HANDLERS: Dict[HookType, Callable[..., dict]] = {
+    HookType.GITHUB: process_github_event,
+    HookType.GITLAB: process_gitlab_event,
+}
+
+
+def claim_job() -> Optional[JobModel]:
+    """Atomically mark the oldest available job as running and return it.
+
+    Running jobs whose lease expired (the worker died while processing them)
+    are claimed again until they reach the maximum number of attempts.
+    """
+    now = datetime.utcnow()
+    timeout = current_app.config.get("JOB_TIMEOUT", 600)
+    max_attempts = current_app.config.get("JOB_MAX_ATTEMPTS", 3)
+    expired = and_(
+        JobModel.status == JobStatus.RUNNING,
+        JobModel.started_at < now - timedelta(seconds=timeout),
+    )
+
+    JobModel.query.filter(expired, JobModel.attempts >= max_attempts).update(
+        {"status": JobStatus.FAILED}, synchronize_session=False
+    )
+    db.session.commit()
+
+    due = or_(JobModel.scheduled_at.is_(None), JobModel.scheduled_at <= now)
+    candidates = (
+        JobModel.query.filter(
+            or_(and_(JobModel.status == JobStatus.PENDING, due), expired)
+        )
+        .order_by(JobModel.id)
+        .limit(10)
+        .all()
+    )
+    for job in candidates:
+        claimed = JobModel.query.filter(
+            JobModel.id == job.id,
+            JobModel.status == job.status,
+            JobModel.started_at == job.started_at,
+        ).update(
+            {
+                "status": JobStatus.RUNNING,
+                "started_at": now,
+                "attempts": JobModel.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+        if claimed:
+            db.session.refresh(job)
+            return job
+    return None
+
+
+def run_job(job: JobModel):
+    """Process a claimed job and store its outcome.
+
+    Jobs failing to sync for any target fail. Jobs parked for a target
+    still unavailable are scheduled again, with an exponential backoff, up
+    to PARKED_JOB_MAX_ATTEMPTS (10 by default) times.
+    """
+    handler = HANDLERS[job.hook.hook_type]
+    try:
+        data = json.loads(job.payload)
+        response = handler(job.event_type, data, job.hook.endpoint, job.api_id)
+        # lets forges redeliver events which failed to sync for a target
+        job.status = JobStatus.FAILED if failed(response) else JobStatus.DONE
+    except Exception as err:
+        current_app.logger.error(str(err))
+        response = {"status": "error"}
+        job.status = JobStatus.FAILED
+
+    parked = any(
+        isinstance(status, dict) and status.get("status") == "parked"
+        for status in response.values()
+    )
+    if job.api_id is not None and parked:
+        max_attempts = current_app.config.get("PARKED_JOB_MAX_ATTEMPTS", 10)
+        if job.attempts < max_attempts:
+            timeout = current_app.config.get("CIRCUIT_RESET_TIMEOUT", 60)
+            delay = min(timeout * 2 ** (job.attempts - 1), 3600)
+            job.status = JobStatus.PENDING
+            job.scheduled_at = datetime.utcnow() + timedelta(seconds=delay)
+        else:
+            job.status = JobStatus.FAILED
+
+    job.response = json.dumps(response)
+    db.session.commit()
+
+
+def process_next_job() -> bool:
+    """Process the next available job, return False if the queue is empty."""
+    job = claim_job()
+    if job is None:
+        return False
+
+    run_job(job)
+    return True
+
+
+class Worker:
+    """Pool of threads draining the job queue."""
+
+    def __init__(self, app: Flask, concurrency: int = 1, poll_interval=1.0):
+        self.app = app
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def run(self):
+        """Start the worker threads and block until stopped."""
+        for index in range(self.concurrency):
+            thread = threading.Thread(
+                target=self._loop, name=f"anyrepo-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        self.app.logger.info(f"Started {self.concurrency} queue workers")
+        purge_interval = self.app.config.get("REQUEST_PURGE_INTERVAL")
+        if purge_interval:
+            thread = threading.Thread(
+                target=self._purge_loop,
+                args=(purge_interval,),
+                name="anyrepo-purge",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        try:
+            while not self._stop.wait(self.poll_interval):
+                pass
+        except KeyboardInterrupt:
+            self.stop()
+
+        for thread in self._threads:
+            thread.join()
+
+    def stop(self):
+        """Ask the worker threads to exit after their current job."""
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    processed = process_next_job()
+            except Exception as err:
+                self.app.logger.error(str(err))
+                processed = False
+
+            if not processed:
+                self._stop.wait(self.poll_interval)
+
+    def _purge_loop(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    purge_requests()
+            except Exception as err:
+                self.app.logger.error(str(err))
+
+            self._stop.wait(interval)
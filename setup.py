@@ -30,4 +30,6 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=requirements,
+    extras_require={"zstd": ["zstandard"]},
+    entry_points={"console_scripts": ["anyrepo=anyrepo.cli:main"]},
 )
@@ -26,6 +26,7 @@ from flask import Flask
 from flask.testing import FlaskClient
 
 from anyrepo import create_app
+from anyrepo.hooks.requestlog import request_log
 from anyrepo.models import db
 from anyrepo.models.api import ApiModel, ApiType
 from anyrepo.models.hook import HookModel
@@ -118,11 +119,13 @@ password = "test2"
 
 
 @pytest.fixture
-def app(config: dict) -> Flask:
+def app(config: dict) -> Iterator[Flask]:
     """Create the app"""
     app_ = create_app()
     app_.config["TESTING"] = True
-    return app_
+    yield app_
+    with app_.app_context():
+        request_log.flush()
 
 
 @pytest.fixture
@@ -164,6 +167,7 @@ def client(app: Flask) -> Iterator[FlaskClient]:
 @pytest.fixture
 def comment():
     class Comment:
+        id = 7
         body_ = "Neque porro quisquam est qui dolorem ipsum quia dolor"
 
         @property
@@ -186,6 +190,10 @@ def comment():
 def issue(comment):
     class Issue:
         state_ = "opened"
+        number = 42
+
+        def get_comment(self, comment_id: int):
+            return comment
 
         def get_comment_from_body(self, body: str):
             return comment
@@ -208,6 +216,11 @@ def issue(comment):
 @pytest.fixture
 def project(issue):
     class Project:
+        path = "anybox/anyrepo"
+
+        def get_issue(self, number: int):
+            return issue
+
         def get_issue_from_title(self, title: str):
             return issue
 
@@ -0,0 +1,84 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import patch
+
+from anyrepo.cache import TTLCache
+
+
+def test_lookup():
+    cache = TTLCache()
+    assert cache.lookup("key") == (False, None)
+
+    cache.set("key", None)
+    assert cache.lookup("key") == (True, None)
+    assert "key" in cache
+    assert cache.stats == {"hits": 1, "misses": 1, "size": 1, "maxsize": 128}
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+@patch("anyrepo.cache.time.monotonic")
+def test_expiration(monotonic):
+    monotonic.return_value = 100
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=1)
+    cache.set("c", 3, ttl=100)
+
+    monotonic.return_value = 105
+    assert cache.get("a") == 1
+    assert cache.get("b", "expired") == "expired"
+
+    monotonic.return_value = 150
+    assert cache.get("a") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 1
+
+
+def test_pop_and_clear():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "missing") == "missing"
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_add():
+    cache = TTLCache(maxsize=2)
+    assert cache.add("a", 1) is True
+    assert cache.add("a", 2) is False
+    assert cache.get("a") == 1
+
+    cache.add("b")
+    cache.add("a")
+    cache.add("c")
+    assert "a" in cache
+    assert "b" not in cache
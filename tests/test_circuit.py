@@ -0,0 +1,183 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import github
+import gitlab
+import pytest
+import requests
+
+from anyrepo.api.circuit import (
+    CircuitBreaker,
+    circuit_breakers,
+    is_retryable,
+    retry_call,
+)
+from anyrepo.models import db
+from anyrepo.models.api import ApiModel
+from anyrepo.models.job import JobModel, JobStatus
+from anyrepo.worker import process_next_job
+
+BAD_GATEWAY = gitlab.exceptions.GitlabGetError("Bad gateway", 502)
+
+
+def test_retryable_errors():
+    assert is_retryable(BAD_GATEWAY)
+    assert is_retryable(gitlab.exceptions.GitlabGetError("Slow down", 429))
+    assert not is_retryable(gitlab.exceptions.GitlabGetError("Nope", 404))
+    assert is_retryable(github.GithubException(503, "Unavailable"))
+    assert is_retryable(github.RateLimitExceededException(403, "Limit"))
+    assert not is_retryable(github.GithubException(422, "Invalid"))
+    assert is_retryable(requests.exceptions.ConnectTimeout())
+    assert not is_retryable(KeyError("title"))
+
+
+@patch("anyrepo.api.circuit.time")
+def test_transient_errors_retried(time_):
+    call = MagicMock(side_effect=[BAD_GATEWAY, BAD_GATEWAY, "done"])
+    assert retry_call(call, 3, 1, 3) == "done"
+    delays = [args[0] for args, _ in time_.sleep.call_args_list]
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+
+    call = MagicMock(side_effect=BAD_GATEWAY)
+    with pytest.raises(gitlab.exceptions.GitlabGetError):
+        retry_call(call, 2)
+    assert call.call_count == 2
+
+    call = MagicMock(side_effect=KeyError("title"))
+    with pytest.raises(KeyError):
+        retry_call(call, 3)
+    assert call.call_count == 1
+
+
+@patch("anyrepo.api.circuit.time")
+def test_circuit_breaker(time_):
+    time_.monotonic.return_value = 100.0
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow() and breaker.state == "closed"
+
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.state == "open"
+
+    time_.monotonic.return_value = 130.0
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.allow() and breaker.state == "closed"
+
+
+@pytest.fixture
+def down(app):
+    app.config.update(
+        RETRY_ATTEMPTS=2, RETRY_BACKOFF=0, CIRCUIT_FAILURE_THRESHOLD=1
+    )
+    with patch("anyrepo.models.api.ApiModel.get_client") as get_client:
+        get_client.return_value.get_project_from_name.side_effect = BAD_GATEWAY
+        yield get_client.return_value
+
+
+def post_issue(client, gl_headers, new_gl_issue_str):
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+    response = client.post(
+        "/gitlab/",
+        data=new_gl_issue_str,
+        content_type="application/json",
+        environ_base=gl_headers,
+    )
+    return response.get_json()
+
+
+def test_unavailable_target_parked(
+    app, client, down, dbapi, gl_headers, new_gl_issue_str
+):
+    app.config["PARK_EVENTS"] = True
+    response = post_issue(client, gl_headers, new_gl_issue_str)
+    assert response == {"FakeAPI": {"status": "parked"}}
+    assert down.get_project_from_name.call_count == 2
+
+    # the circuit is open, the target is not called anymore
+    response = post_issue(client, gl_headers, new_gl_issue_str)
+    assert response == {"FakeAPI": {"status": "parked"}}
+    assert down.get_project_from_name.call_count == 2
+
+    with app.app_context():
+        api_id = ApiModel.query.filter_by(name="FakeAPI").one().id
+        jobs = JobModel.query.all()
+        assert len(jobs) == 2
+        assert {job.api_id for job in jobs} == {api_id}
+        assert all(job.scheduled_at > datetime.utcnow() for job in jobs)
+        assert json.loads(jobs[0].payload)["object_attributes"]["iid"] == 23
+
+        res = client.get("/apis/")
+        assert b"circuit open" in res.data
+
+
+def test_unavailable_target_failed_without_worker(
+    app, client, down, dbapi, gl_headers, new_gl_issue_str
+):
+    response = post_issue(client, gl_headers, new_gl_issue_str)
+    assert response == {"FakeAPI": {"status": "error"}}
+
+    response = post_issue(client, gl_headers, new_gl_issue_str)
+    assert response == {"FakeAPI": {"status": "error"}}
+    assert down.get_project_from_name.call_count == 2
+
+    with app.app_context():
+        assert JobModel.query.count() == 0
+
+
+def test_parked_job_rescheduled(
+    app, api, down, dbapi, gitlab_hook, new_gl_issue_str
+):
+    with app.app_context():
+        api_id = ApiModel.query.filter_by(name="FakeAPI").one().id
+        job = JobModel(
+            hook_id=gitlab_hook.id,
+            api_id=api_id,
+            event_type="Issue Hook",
+            payload=new_gl_issue_str,
+            scheduled_at=datetime(2020, 1, 1),
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        assert process_next_job() is True
+        db.session.refresh(job)
+        assert job.status == JobStatus.PENDING
+        assert job.scheduled_at > datetime.utcnow()
+        assert process_next_job() is False
+        assert JobModel.query.count() == 1
+
+        # the target is back
+        circuit_breakers.get(api_id).record_success()
+        down.get_project_from_name.side_effect = None
+        down.get_project_from_name.return_value = None
+        job.scheduled_at = datetime(2020, 1, 1)
+        db.session.commit()
+
+        assert process_next_job() is True
+        db.session.refresh(job)
+        assert job.status == JobStatus.DONE
+        assert json.loads(job.response) == {
+            "FakeAPI": {"status": "issues skipped"}
+        }
@@ -0,0 +1,87 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+from sqlalchemy import inspect, text
+
+from anyrepo.models import db
+from anyrepo.models.compression import Compressor
+from anyrepo.models.request import RequestModel
+
+PAYLOAD = json.dumps({"issue": {"title": "Test", "body": "x" * 1000}})
+
+
+def test_compress():
+    compressor = Compressor()
+    compressed = compressor.compress(PAYLOAD)
+    assert compressed.startswith("zl::")
+    assert len(compressed) < len(PAYLOAD) / 5
+    assert compressor.decompress(compressed) == PAYLOAD
+
+    # small and plain values are stored as is
+    assert compressor.compress("{}") == "{}"
+    assert compressor.decompress(PAYLOAD) == PAYLOAD
+
+    marked = "zl::not compressed"
+    assert compressor.compress(marked) != marked
+    assert compressor.decompress(compressor.compress(marked)) == marked
+
+    assert Compressor("none").compress(PAYLOAD) == PAYLOAD
+
+
+def test_compress_dictionary():
+    compressor = Compressor(dictionary=PAYLOAD.encode("utf-8"))
+    compressed = compressor.compress(PAYLOAD)
+    assert compressed.startswith(f"zl:{compressor.dictionary_id}:")
+    assert len(compressed) < len(Compressor().compress(PAYLOAD))
+    assert compressor.decompress(compressed) == PAYLOAD
+
+    with pytest.raises(ValueError):
+        Compressor().decompress(compressed)
+
+
+def test_compress_zstd():
+    pytest.importorskip("zstandard")
+    compressor = Compressor("zstd", 3)
+    compressed = compressor.compress(PAYLOAD)
+    assert compressed.startswith("zs::")
+    assert Compressor().decompress(compressed) == PAYLOAD
+
+
+def test_request_compressed(app, gitlab_hook):
+    with app.app_context():
+        request_model = RequestModel(
+            hook_id=gitlab_hook.id,
+            headers="{}",
+            body=PAYLOAD,
+            response="{}",
+            status=200,
+        )
+        db.session.add(request_model)
+        db.session.commit()
+        db.session.expunge_all()
+
+        raw = db.session.execute(
+            text("SELECT body, headers FROM request")
+        ).first()
+        assert raw[0].startswith("zl::")
+        assert raw[1] == "{}"
+
+        request_model = RequestModel.query.one()
+        assert "body" in inspect(request_model).unloaded
+        assert request_model.body == PAYLOAD
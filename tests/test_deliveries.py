@@ -0,0 +1,159 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import hmac
+from unittest.mock import MagicMock, patch
+
+from anyrepo.hooks.deliveries import deliveries
+from anyrepo.models import db
+from anyrepo.models.delivery import DeliveryModel
+from anyrepo.models.hook import HookType
+from anyrepo.models.job import JobModel, JobStatus
+from anyrepo.models.request import SYNC_FAILED_STATUS, RequestModel
+from anyrepo.worker import HANDLERS, process_next_job
+
+
+def test_github_duplicate_skipped(app, client, gh_headers, gh_secret):
+    signature = hmac.new(gh_secret, b"{}", "sha1").hexdigest()
+    gh_headers["HTTP_X_HUB_SIGNATURE"] = f"sha1={signature}"
+    gh_headers["HTTP_X_GITHUB_DELIVERY"] = "72d3162e"
+    response = client.post("/github/", json={}, environ_base=gh_headers)
+    assert response.get_json() == {"msg": "pong"}
+
+    response = client.post("/github/", json={}, environ_base=gh_headers)
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "duplicate"}
+
+    with app.app_context():
+        delivery_ids = [rm.delivery_id for rm in RequestModel.query]
+        assert delivery_ids == ["72d3162e", None]
+
+
+@patch("anyrepo.hooks.gitlab_hook.process_event")
+def test_gitlab_duplicate_skipped(process_event, client, gl_headers):
+    process_event.return_value = {"status": "skipped"}
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+    gl_headers["HTTP_X_GITLAB_EVENT_UUID"] = "13792a34"
+    for _ in range(2):
+        response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.get_json() == {"status": "duplicate"}
+    assert process_event.call_count == 1
+
+    gl_headers["HTTP_X_GITLAB_EVENT_UUID"] = "0a0e2b6d"
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.get_json() == {"status": "skipped"}
+
+
+def test_logged_delivery_seen(app, gitlab_hook):
+    with app.app_context():
+        db.session.add(
+            RequestModel(
+                hook_id=gitlab_hook.id,
+                delivery_id="13792a34",
+                headers="{}",
+                body="{}",
+                response="{}",
+                status=200,
+            )
+        )
+        db.session.commit()
+
+        assert deliveries.seen("13792a34")
+        assert not deliveries.seen("0a0e2b6d")
+        assert deliveries.seen("0a0e2b6d")
+
+
+def test_failed_delivery_forgotten(client, gl_headers):
+    gl_headers["HTTP_X_GITLAB_EVENT_UUID"] = "13792a34"
+    with patch("anyrepo.hooks.gitlab_hook.process_event") as process_event:
+        process_event.return_value = {"msg": "pong"}
+        with patch("anyrepo.hooks.gitlab_hook.jsonify") as jsonify:
+            jsonify.side_effect = RuntimeError("Boom")
+            client.application.config["PROPAGATE_EXCEPTIONS"] = False
+            response = client.post(
+                "/gitlab/", json={}, environ_base=gl_headers
+            )
+            assert response.status_code == 500
+
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.get_json() == {"msg": "pong"}
+
+
+@patch("anyrepo.hooks.gitlab_hook.process_event")
+def test_failed_sync_redelivered(process_event, client, gl_headers):
+    process_event.return_value = {"FakeAPI": {"status": "error"}}
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+    gl_headers["HTTP_X_GITLAB_EVENT_UUID"] = "13792a34"
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.status_code == 200
+
+    process_event.return_value = {"FakeAPI": {"status": "done"}}
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.get_json() == {"FakeAPI": {"status": "done"}}
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.get_json() == {"status": "duplicate"}
+    assert process_event.call_count == 2
+
+    with client.application.app_context():
+        statuses = [rm.status for rm in RequestModel.query]
+        assert statuses == [SYNC_FAILED_STATUS, 200, 200]
+
+
+def test_failed_job_redelivered(app, client, gl_headers):
+    app.config["ASYNC_HOOKS"] = True
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+    gl_headers["HTTP_X_GITLAB_EVENT_UUID"] = "13792a34"
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.status_code == 202
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.get_json() == {"status": "duplicate"}
+
+    with app.app_context():
+        job = JobModel.query.one()
+        assert job.delivery_id == "13792a34"
+        job.status = JobStatus.FAILED
+        db.session.commit()
+
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.status_code == 202
+
+
+def test_failed_sync_job_redelivered(app, client, gl_headers):
+    app.config["ASYNC_HOOKS"] = True
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+    gl_headers["HTTP_X_GITLAB_EVENT_UUID"] = "13792a34"
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.status_code == 202
+
+    handler = MagicMock(return_value={"FakeAPI": {"status": "error"}})
+    with app.app_context(), patch.dict(HANDLERS, {HookType.GITLAB: handler}):
+        assert process_next_job() is True
+        assert JobModel.query.one().status == JobStatus.FAILED
+
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.status_code == 202
+
+
+def test_delivery_claimed_for_other_processes(app):
+    with app.app_context():
+        assert not deliveries.seen("13792a34")
+        # another process, which did not cache the delivery
+        deliveries._cache.pop("13792a34")
+        assert deliveries.seen("13792a34")
+
+        deliveries.forget("13792a34")
+        assert not deliveries.seen("13792a34")
+        assert DeliveryModel.query.count() == 1
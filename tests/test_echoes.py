@@ -0,0 +1,98 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from anyrepo.hooks.echoes import echoes
+from anyrepo.models.echo import EchoModel
+from anyrepo.retention import purge_requests
+
+ISSUE = ("example.com", "gitlabhq/gitlab-test", "issue", 23)
+
+
+def test_writes_recorded(app):
+    with app.app_context():
+        echoes.record(*ISSUE, "opened")
+        assert echoes.is_echo(*ISSUE, "opened")
+        assert not echoes.is_echo(*ISSUE, "closed")
+
+        # another process recorded it
+        app.extensions["anyrepo_echoes"].clear()
+        assert echoes.is_echo(*ISSUE, "opened")
+
+
+def test_echoes_expire(app):
+    with app.app_context():
+        echoes.record(*ISSUE, "opened")
+        app.extensions["anyrepo_echoes"].clear()
+        assert purge_requests(datetime.utcnow() + timedelta(minutes=1)) == 0
+        assert EchoModel.query.count() == 1
+
+        later = datetime.utcnow() + timedelta(minutes=5)
+        with patch("anyrepo.hooks.echoes.datetime") as dt:
+            dt.utcnow.return_value = later
+            assert not echoes.is_echo(*ISSUE, "opened")
+
+        purge_requests(later)
+        assert EchoModel.query.count() == 0
+
+
+@patch("anyrepo.models.api.ApiModel.get_client")
+def test_issue_echo_skipped(
+    get_client, app, client, dbapi, gl_headers, new_gl_issue_str
+):
+    with app.app_context():
+        echoes.record(*ISSUE, "opened")
+
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+    response = client.post(
+        "/gitlab/",
+        data=new_gl_issue_str,
+        content_type="application/json",
+        environ_base=gl_headers,
+    )
+    assert response.get_json() == {"status": "echo skipped"}
+    get_client.assert_not_called()
+
+
+@patch("anyrepo.models.api.ApiModel.get_client")
+def test_comment_mirror_recorded(
+    get_client,
+    app,
+    client,
+    api,
+    dbapi,
+    gl_headers,
+    new_gl_issue_comment_str,
+    issue,
+):
+    get_client.return_value = api
+    issue.get_comment_from_body = lambda x: None
+
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Note Hook"
+    response = client.post(
+        "/gitlab/",
+        data=new_gl_issue_comment_str,
+        content_type="application/json",
+        environ_base=gl_headers,
+    )
+    assert response.get_json() == {"FakeAPI": {"status": "done"}}
+
+    with app.app_context():
+        assert echoes.is_echo(
+            "fakeapi.com", "anybox/anyrepo", "comment", 7, "Hello world"
+        )
@@ -0,0 +1,159 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from anyrepo.api.etag import (
+    CachedResponse,
+    ConditionalAdapter,
+    ResponseCache,
+    ResponseStore,
+)
+from anyrepo.api.gitlab_api import GitlabAPI
+from anyrepo.api.http import http_pool
+
+URL = "https://gitlab.com/api/v4/projects/anybox%2Fanyrepo"
+PROJECT = {"id": 1, "path_with_namespace": "anybox/anyrepo"}
+
+
+def make_response(status: int, headers: dict, body: bytes = b""):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response._content = body
+    response.url = URL
+    response.connection = None
+    return response
+
+
+@pytest.fixture
+def send():
+    with patch("requests.adapters.HTTPAdapter.send") as send_:
+        yield send_
+
+
+def get(session: requests.Session, token: str = "mytoken"):
+    return session.get(URL, headers={"Private-Token": token})
+
+
+def test_response_revalidated(send):
+    session = requests.Session()
+    session.mount("https://", ConditionalAdapter(ResponseCache()))
+    send.return_value = make_response(
+        200,
+        {"ETag": '"v1"', "Content-Type": "application/json"},
+        json.dumps(PROJECT).encode(),
+    )
+    assert get(session).json() == PROJECT
+    assert "If-None-Match" not in send.call_args[0][0].headers
+
+    send.return_value = make_response(
+        304, {"ETag": '"v1"', "RateLimit-Remaining": "599"}
+    )
+    response = get(session)
+    assert send.call_args[0][0].headers["If-None-Match"] == '"v1"'
+    assert response.status_code == 200
+    assert response.json() == PROJECT
+    assert response.headers["RateLimit-Remaining"] == "599"
+
+    # another identity does not get the response
+    send.return_value = make_response(200, {}, b"{}")
+    assert get(session, "another token").json() == {}
+    assert "If-None-Match" not in send.call_args[0][0].headers
+
+
+def test_changed_response_cached(send):
+    session = requests.Session()
+    session.mount("https://", ConditionalAdapter(ResponseCache()))
+    send.return_value = make_response(
+        200, {"Last-Modified": "Tue, 01 Dec 2020 10:00:00 GMT"}, b"1"
+    )
+    get(session)
+
+    send.return_value = make_response(200, {"ETag": '"v2"'}, b"2")
+    assert get(session).content == b"2"
+    headers = send.call_args[0][0].headers
+    assert headers["If-Modified-Since"] == "Tue, 01 Dec 2020 10:00:00 GMT"
+
+    send.return_value = make_response(304, {})
+    assert get(session).content == b"2"
+    assert send.call_args[0][0].headers["If-None-Match"] == '"v2"'
+
+
+def test_writes_not_cached(send):
+    session = requests.Session()
+    session.mount("https://", ConditionalAdapter(ResponseCache()))
+    send.return_value = make_response(201, {"ETag": '"v1"'}, b"{}")
+    session.post(URL, json={"title": "Test"})
+    session.post(URL, json={"title": "Test"})
+    assert "If-None-Match" not in send.call_args[0][0].headers
+
+
+def test_response_stored(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    entry = CachedResponse('"v1"', None, {"ETag": '"v1"'}, b"{}")
+    ResponseCache(path=path).set("key", entry)
+
+    cache = ResponseCache(path=path)
+    assert cache.get("key") == entry
+    assert cache.get("other key") is None
+
+
+def test_store_pruned(tmp_path):
+    store = ResponseStore(str(tmp_path / "responses.sqlite"), size=2)
+    store.PRUNE_EVERY = 3
+    for key in ("a", "b", "c"):
+        store.set(key, CachedResponse(None, None, {}, key.encode()))
+    assert store.get("a") is None
+    assert store.get("c").body == b"c"
+
+
+def test_gitlab_budget_from_revalidation(app, send):
+    send.return_value = make_response(
+        200,
+        {
+            "ETag": '"v1"',
+            "Content-Type": "application/json",
+            "RateLimit-Remaining": "600",
+        },
+        json.dumps(PROJECT).encode(),
+    )
+    with app.app_context():
+        api = GitlabAPI(
+            "https://gitlab.com",
+            "mytoken",
+            session=http_pool.session("https://gitlab.com"),
+        )
+    assert api.find_project("anybox/anyrepo").path == "anybox/anyrepo"
+
+    send.return_value = make_response(
+        304, {"ETag": '"v1"', "RateLimit-Remaining": "600"}
+    )
+    assert api.find_project("anybox/anyrepo").path == "anybox/anyrepo"
+    assert send.call_args[0][0].headers["If-None-Match"] == '"v1"'
+    assert api.budget.remaining == 600
+
+
+def test_cache_disabled(app):
+    app.config["ETAG_CACHE_SIZE"] = 0
+    http_pool.init_app(app)
+    with app.app_context():
+        adapter = http_pool.get_adapter("https://gitlab.com")
+        assert not isinstance(adapter, ConditionalAdapter)
@@ -0,0 +1,102 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from click.testing import CliRunner
+
+from anyrepo.cli import main
+from anyrepo.models import db
+from anyrepo.models.request import RequestModel
+
+
+@pytest.fixture
+def requests(app, gitlab_hook, github_hook):
+    with app.app_context():
+        for day, hook, status in [
+            (1, gitlab_hook, 200),
+            (2, gitlab_hook, 403),
+            (3, github_hook, 200),
+            (4, gitlab_hook, 500),
+        ]:
+            db.session.add(
+                RequestModel(
+                    hook_id=hook.id,
+                    headers="{}",
+                    body=json.dumps({"day": day}),
+                    response="{}",
+                    status=status,
+                    created_at=datetime(2020, 1, day),
+                )
+            )
+        db.session.commit()
+
+
+def test_export_ndjson(client, requests, gitlab_hook):
+    res = client.get("/requests/export/")
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.data.splitlines()]
+    assert [json.loads(row["body"])["day"] for row in rows] == [1, 2, 3, 4]
+    assert rows[0]["hook"] == "/gitlab/"
+    assert rows[0]["created_at"] == "2020-01-01T00:00:00"
+
+    query = {"hook": gitlab_hook.slug, "status": "bad", "until": "2020-01-04"}
+    res = client.get("/requests/export/", query_string=query)
+    rows = [json.loads(line) for line in res.data.splitlines()]
+    assert [row["status"] for row in rows] == [403]
+
+
+def test_export_csv(client, requests):
+    query = {"format": "csv", "status": "200", "since": "2020-01-02"}
+    res = client.get("/requests/export/", query_string=query)
+    assert res.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(res.data.decode("utf-8"))))
+    assert [(row["hook"], row["status"]) for row in rows] == [
+        ("/github/", "200")
+    ]
+
+
+def test_export_invalid(client):
+    for query in ({"format": "xml"}, {"status": "ok"}, {"since": "today"}):
+        res = client.get("/requests/export/", query_string=query)
+        assert res.status_code == 400
+
+    res = client.get("/requests/export/", query_string={"hook": "notaslug"})
+    assert res.status_code == 404
+
+
+def test_export_cli(requests):
+    runner = CliRunner()
+    result = runner.invoke(
+        main, ["export", "--hook", "/gitlab/", "--status", "bad"]
+    )
+    assert result.exit_code == 0
+    statuses = [
+        json.loads(line)["status"] for line in result.stdout.splitlines()
+    ]
+    assert statuses == [403, 500]
+
+    result = runner.invoke(main, ["export", "--hook", "/unknown/"])
+    assert result.exit_code != 0
+
+    result = runner.invoke(main, ["export", "--status", "foo"])
+    assert result.exit_code == 2
+    assert "--status" in result.output
@@ -18,6 +18,8 @@
 from collections import namedtuple
 from unittest.mock import MagicMock, patch
 
+import github
+
 from anyrepo.api.github_api import (
     GithubAPI,
     GithubComment,
@@ -93,6 +95,40 @@ def test_get_repo_not_found(user_patched):
     assert res is None
 
 
+@patch("github.AuthenticatedUser")
+def test_get_repo_cached(user_patched):
+    user_patched.get_repos.return_value = [Repo(name="test")]
+
+    api_ = GithubAPI("https://github.com", "mytoken")
+    api_._user = user_patched
+    res = api_.get_project_from_name("test")
+    assert api_.get_project_from_name("test") is res
+    assert user_patched.get_repos.call_count == 1
+
+    assert api_.get_project_from_name("test2") is None
+    assert api_.get_project_from_name("test2") is None
+    assert user_patched.get_repos.call_count == 2
+    assert api_.projects.stats["hits"] == 2
+    assert api_.projects.stats["misses"] == 2
+
+
+@patch("github.AuthenticatedUser")
+def test_get_repo_from_path(user_patched):
+    api_ = GithubAPI("https://github.com", "mytoken")
+    api_._user = user_patched
+    api_._client = MagicMock()
+
+    res = api_.get_project_from_name("anybox/test")
+    assert isinstance(res, GithubProject)
+    api_._client.get_repo.assert_called_with("anybox/test")
+    assert not user_patched.get_repos.called
+
+    api_._client.get_repo.side_effect = github.UnknownObjectException(
+        404, "Not found"
+    )
+    assert api_.get_project_from_name("anybox/test2") is None
+
+
 def test_get_issue_empty():
     project = FakeProject()
     project.get_issues.return_value = []
@@ -128,11 +164,27 @@ def test_create_issue():
     project = FakeProject()
 
     gh_project_ = GithubProject(project)
-    gh_project_.create_issue("A title", "A body")
+    res = gh_project_.create_issue("A title", "A body")
 
-    assert project.create_issue.called_with(
-        {"title": "A title", "description": "A body"}
-    )
+    assert isinstance(res, GithubIssue)
+    project.create_issue.assert_called_with(title="A title", body="A body")
+
+
+def test_get_issue_from_number():
+    project = MagicMock()
+    project.full_name = "anybox/anyrepo"
+    project.get_issue.return_value.number = 42
+
+    gh_project_ = GithubProject(project)
+    res = gh_project_.get_issue(42)
+
+    assert gh_project_.path == "anybox/anyrepo"
+    assert isinstance(res, GithubIssue)
+    assert res.number == 42
+    project.get_issue.assert_called_with(42)
+
+    project.get_issue.side_effect = github.UnknownObjectException(404, {})
+    assert gh_project_.get_issue(43) is None
 
 
 def test_get_issue_comment_empty():
@@ -173,9 +225,25 @@ def test_create_comment():
     issue = FakeIssue()
 
     gh_issue_ = GithubIssue(issue)
-    gh_issue_.create_comment("test")
+    res = gh_issue_.create_comment("test")
+
+    assert isinstance(res, GithubComment)
+    issue.create_comment.assert_called_with(body="test")
+
+
+def test_get_comment_from_id():
+    issue = MagicMock()
+    issue.get_comment.return_value.id = 7
+
+    gh_issue_ = GithubIssue(issue)
+    res = gh_issue_.get_comment(7)
+
+    assert isinstance(res, GithubComment)
+    assert res.id == 7
+    issue.get_comment.assert_called_with(7)
 
-    assert issue.create_comment.called_with({"body": "test"})
+    issue.get_comment.side_effect = github.UnknownObjectException(404, {})
+    assert gh_issue_.get_comment(8) is None
 
 
 def test_issue_state():
@@ -18,6 +18,8 @@
 from collections import namedtuple
 from unittest.mock import MagicMock, patch
 
+import gitlab
+
 from anyrepo.api.gitlab_api import (
     GitlabAPI,
     GitlabComment,
@@ -39,6 +41,7 @@ class FakeIssue:
 
     state_event = "opened"
     discussions = MagicMock()
+    notes = MagicMock()
     save = MagicMock()
 
 
@@ -85,6 +88,20 @@ def test_get_repo(gitlab_patched):
     assert api_._client.projects.list.called_with({"search": "test"})
 
 
+@patch("gitlab.Gitlab")
+def test_get_repo_from_path(gitlab_patched):
+    api_ = GitlabAPI("https://gitlab.com/", "mytoken")
+    api_._client.projects = MagicMock()
+
+    res = api_.get_project_from_name("mirrors/anybox/test")
+    assert isinstance(res, GitlabProject)
+    api_._client.projects.get.assert_called_with("mirrors/anybox/test")
+    assert not api_._client.projects.list.called
+
+    api_._client.projects.get.side_effect = gitlab.exceptions.GitlabGetError
+    assert api_.get_project_from_name("mirrors/anybox/test2") is None
+
+
 def test_get_issue_empty():
     project = FakeProject()
     project.issues.list.return_value = []
@@ -120,13 +137,31 @@ def test_create_issue():
     project = FakeProject()
 
     gl_project_ = GitlabProject(project)
-    gl_project_.create_issue("A title", "A body")
+    res = gl_project_.create_issue("A title", "A body")
 
-    assert project.issues.create_issue.called_with(
+    assert isinstance(res, GitlabIssue)
+    project.issues.create.assert_called_with(
         {"title": "A title", "description": "A body"}
     )
 
 
+def test_get_issue_from_number():
+    project = MagicMock()
+    project.path_with_namespace = "anybox/anyrepo"
+    project.issues.get.return_value.iid = 42
+
+    gl_project_ = GitlabProject(project)
+    res = gl_project_.get_issue(42)
+
+    assert gl_project_.path == "anybox/anyrepo"
+    assert isinstance(res, GitlabIssue)
+    assert res.number == 42
+    project.issues.get.assert_called_with(42)
+
+    project.issues.get.side_effect = gitlab.exceptions.GitlabGetError()
+    assert gl_project_.get_issue(43) is None
+
+
 def test_get_issue_comment_empty():
     issue = FakeIssue()
     issue.discussions.list.return_value = []
@@ -177,9 +212,25 @@ def test_create_comment():
     issue = FakeIssue()
 
     gl_issue_ = GitlabIssue(issue)
-    gl_issue_.create_comment("test")
+    res = gl_issue_.create_comment("test")
+
+    assert isinstance(res, GitlabComment)
+    issue.notes.create.assert_called_with({"body": "test"})
+
+
+def test_get_comment_from_id():
+    issue = MagicMock()
+    issue.notes.get.return_value.id = 7
+
+    gl_issue_ = GitlabIssue(issue)
+    res = gl_issue_.get_comment(7)
+
+    assert isinstance(res, GitlabComment)
+    assert res.id == 7
+    issue.notes.get.assert_called_with(7)
 
-    assert issue.discussions.create.called_with({"body": "test"})
+    issue.notes.get.side_effect = gitlab.exceptions.GitlabGetError()
+    assert gl_issue_.get_comment(8) is None
 
 
 def test_issue_state():
@@ -0,0 +1,168 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+from unittest.mock import MagicMock
+
+from anyrepo.hooks import (
+    SourceComment,
+    SourceIssue,
+    fan_out,
+    find_comment,
+    find_issue,
+    get_hook_option,
+    get_target_path,
+    link_comment,
+    link_issue,
+    unlink_comment,
+)
+from anyrepo.models.api import ApiModel
+from anyrepo.models.link import CommentLinkModel, IssueLinkModel
+
+
+def test_hook_option(app):
+    with app.app_context():
+        assert get_hook_option("/github/", "fanout_width", 4) == 4
+
+        app.config["FANOUT_WIDTH"] = 2
+        assert get_hook_option("/github/", "fanout_width", 4) == 2
+
+        app.config["HOOK_OPTIONS"]["/github/"]["fanout_width"] = 8
+        assert get_hook_option("/github/", "fanout_width", 4) == 8
+        assert get_hook_option("/gitlab/", "fanout_width", 4) == 2
+
+
+def test_target_path(app):
+    with app.app_context():
+        path = "acme/tools/foo"
+        assert get_target_path("/github/", path) == "foo"
+
+        namespaces = {"acme": "mirrors/acme", "acme/tools": "tools"}
+        app.config["HOOK_OPTIONS"]["/github/"]["namespaces"] = namespaces
+        assert get_target_path("/github/", path) == "tools/foo"
+        assert get_target_path("/github/", "acme/bar") == "mirrors/acme/bar"
+        assert get_target_path("/github/", "acmeinc/bar") == "bar"
+
+        namespaces.update({"": "", "acme/tools/foo": "other/foo2"})
+        assert get_target_path("/github/", path) == "other/foo2"
+        assert get_target_path("/github/", "acmeinc/bar") == "acmeinc/bar"
+
+
+def test_fan_out_parallel(app):
+    with app.app_context():
+        apis = ApiModel.query.all()
+        barrier = threading.Barrier(len(apis), timeout=5)
+
+        def sync(api):
+            barrier.wait()
+            return {"status": api.url}
+
+        response = fan_out(apis, sync, len(apis))
+        assert response == {api.name: {"status": api.url} for api in apis}
+
+
+def test_fan_out_sequential(app):
+    with app.app_context():
+        apis = ApiModel.query.all()
+        threads = set()
+
+        def sync(api):
+            threads.add(threading.get_ident())
+            return {"status": "done"}
+
+        response = fan_out(apis, sync, 1)
+        assert set(response) == {api.name for api in apis}
+        assert threads == {threading.get_ident()}
+
+
+def test_find_issue_by_link(app, project, issue):
+    source = SourceIssue("github.com", "Codertocat/Hello-World", 1)
+    project.get_issue = MagicMock(return_value=issue)
+    project.get_issue_from_title = MagicMock(return_value=None)
+
+    with app.app_context():
+        assert find_issue(source, project, "gitlab.com", "title") is None
+        assert project.get_issue_from_title.called
+
+        link_issue(source, project, "gitlab.com", issue)
+        project.get_issue_from_title.reset_mock()
+
+        assert find_issue(source, project, "gitlab.com", "title") is issue
+        project.get_issue.assert_called_with(issue.number)
+        assert not project.get_issue_from_title.called
+
+        # the mirrored issue leads back to the source one
+        mirror = SourceIssue("gitlab.com", project.path, issue.number)
+        project.path = source.project
+        project.get_issue.reset_mock()
+        assert find_issue(mirror, project, "github.com", "title") is issue
+        project.get_issue.assert_called_with(1)
+
+
+def test_find_issue_backfills_link(app, project, issue):
+    source = SourceIssue("github.com", "Codertocat/Hello-World", 1)
+
+    with app.app_context():
+        assert find_issue(source, project, "gitlab.com", "title") is issue
+
+        link = IssueLinkModel.query.filter_by(
+            source_host="github.com", source_number=1
+        ).one()
+        assert link.target_host == "gitlab.com"
+        assert link.target_project == project.path
+        assert link.target_number == issue.number
+
+
+def test_find_comment_by_link(app, project, issue, comment):
+    source = SourceComment(SourceIssue("github.com", "Codertocat/Hello", 1), 3)
+    issue.get_comment = MagicMock(return_value=comment)
+    issue.get_comment_from_body = MagicMock(return_value=None)
+
+    with app.app_context():
+        res = find_comment(source, project, issue, "gitlab.com", "body")
+        assert res is None
+        assert issue.get_comment_from_body.called
+
+        link_comment(source, project, issue, "gitlab.com", comment, "body")
+        issue.get_comment_from_body.reset_mock()
+
+        res = find_comment(source, project, issue, "gitlab.com", "edited")
+        assert res is comment
+        issue.get_comment.assert_called_with(comment.id)
+        assert not issue.get_comment_from_body.called
+
+        # unknown source comment with the same body as a linked one
+        other = SourceComment(source.issue, 4)
+        issue.get_comment.reset_mock()
+        res = find_comment(other, project, issue, "gitlab.com", "body")
+        assert res is comment
+        issue.get_comment.assert_called_with(comment.id)
+
+        unlink_comment(source, "gitlab.com")
+        assert CommentLinkModel.query.count() == 0
+
+
+def test_find_comment_backfills_link(app, project, issue, comment):
+    source = SourceComment(SourceIssue("github.com", "Codertocat/Hello", 1), 3)
+
+    with app.app_context():
+        res = find_comment(source, project, issue, "gitlab.com", "body")
+        assert res is comment
+
+        link = CommentLinkModel.query.filter_by(source_comment=3).one()
+        assert link.target_host == "gitlab.com"
+        assert link.target_issue == issue.number
+        assert link.target_comment == comment.id
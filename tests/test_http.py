@@ -0,0 +1,96 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from http.client import HTTPMessage
+from unittest.mock import MagicMock
+
+import requests
+from requests.cookies import extract_cookies_to_jar
+
+from anyrepo.api.github_api import GithubAPI
+from anyrepo.api.gitlab_api import GitlabAPI
+from anyrepo.api.http import http_pool
+from anyrepo.models import db
+
+
+def test_adapter_shared_by_host(app):
+    with app.app_context():
+        adapter = http_pool.get_adapter("https://gitlab.com")
+        assert http_pool.get_adapter("https://gitlab.com/api/v4") is adapter
+        assert http_pool.get_adapter("https://gitlab.com:8443") is not adapter
+        assert http_pool.get_adapter("https://github.com") is not adapter
+
+        session = http_pool.session("https://gitlab.com")
+        assert session is not http_pool.session("https://gitlab.com")
+        assert session.get_adapter("https://gitlab.com:443/") is adapter
+
+
+def test_session_refuses_cookies(app):
+    msg = HTTPMessage()
+    msg["Set-Cookie"] = "_gitlab_session=abc; path=/"
+    response = MagicMock()
+    response._original_response.msg = msg
+    request = requests.Request("GET", "https://gitlab.com/api/v4").prepare()
+
+    with app.app_context():
+        session = http_pool.session("https://gitlab.com")
+    extract_cookies_to_jar(session.cookies, request, response)
+    assert len(session.cookies) == 0
+
+    session = requests.Session()
+    extract_cookies_to_jar(session.cookies, request, response)
+    assert len(session.cookies) == 1
+
+
+def test_clients_share_connections(app, dbapi):
+    app.config["HTTP_TIMEOUT"] = 5
+    with app.app_context():
+        api_client = dbapi.get_client()
+        assert api_client.timeout == 5
+
+        dbapi.set_token("another token")
+        db.session.commit()
+        new_client = dbapi.get_client()
+        assert new_client is not api_client
+        assert new_client.session is not api_client.session
+        assert new_client.session.get_adapter(
+            dbapi.url
+        ) is api_client.session.get_adapter(dbapi.url)
+
+
+def test_github_session_used():
+    session = MagicMock()
+    session.get.return_value = MagicMock(
+        status_code=200,
+        headers={},
+        text=json.dumps({"full_name": "anybox/anyrepo"}),
+    )
+    api = GithubAPI("https://api.github.com", "mytoken", session=session)
+
+    project = api.get_project_from_name("anybox/anyrepo")
+    assert project.path == "anybox/anyrepo"
+    args, kwargs = session.get.call_args
+    assert args[0] == "https://api.github.com:443/repos/anybox/anyrepo"
+    assert kwargs["timeout"] == 15
+    assert kwargs["headers"]["Authorization"] == "token mytoken"
+
+
+def test_gitlab_session_used():
+    session = requests.Session()
+    api = GitlabAPI("https://gitlab.com", "mytoken", session=session)
+    assert api._client.session is session
+    assert api._client.timeout == 15
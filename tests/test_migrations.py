@@ -0,0 +1,119 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from sqlalchemy import inspect, text
+
+from anyrepo import create_app
+from anyrepo.migrations import MIGRATIONS, get_version, migrate
+from anyrepo.models import db
+from anyrepo.models.request import RequestCounterModel, RequestModel
+from anyrepo.models.search import search_index
+
+
+def get_index_names(table: str):
+    return {index["name"] for index in inspect(db.engine).get_indexes(table)}
+
+
+def test_new_database_migrated(app):
+    with app.app_context():
+        assert get_version() == MIGRATIONS[-1].version
+        assert migrate() == []
+        assert {
+            "ix_request_hook_created",
+            "ix_request_status_created",
+        } <= get_index_names("request")
+
+
+def test_existing_database_migrated(app):
+    with app.app_context():
+        db.session.execute(text("DROP INDEX ix_request_hook_created"))
+        db.session.execute(text("DROP INDEX ix_request_status_created"))
+        db.session.execute(text("DELETE FROM schema_version"))
+        db.session.commit()
+        assert get_version() == 0
+
+        assert migrate() == MIGRATIONS
+        assert get_version() == MIGRATIONS[-1].version
+        assert "ix_request_hook_created" in get_index_names("request")
+
+        plan = db.session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT count(*) FROM request "
+                "WHERE status BETWEEN 200 AND 299"
+            )
+        ).fetchall()
+        assert "ix_request_status_created" in str(plan)
+
+
+def test_request_counters_backfilled(app, gitlab_hook, github_hook):
+    with app.app_context():
+        for hook, status in [
+            (gitlab_hook, 200),
+            (gitlab_hook, 200),
+            (gitlab_hook, 403),
+            (github_hook, 200),
+        ]:
+            db.session.add(
+                RequestModel(
+                    hook_id=hook.id,
+                    headers="{}",
+                    body="{}",
+                    response="{}",
+                    status=status,
+                )
+            )
+        db.session.execute(
+            text("DELETE FROM schema_version WHERE version >= 2")
+        )
+        db.session.commit()
+
+        migrate()
+        counters = {
+            (counter.hook_id, counter.status): counter.count
+            for counter in RequestCounterModel.query
+        }
+        assert counters == {
+            (gitlab_hook.id, 200): 2,
+            (gitlab_hook.id, 403): 1,
+            (github_hook.id, 200): 1,
+        }
+
+
+def test_app_upgraded_with_requests(app, gitlab_hook):
+    body = '{"title": "Broken build", "description": "%s"}' % ("x" * 300)
+    with app.app_context():
+        db.session.add(
+            RequestModel(
+                hook_id=gitlab_hook.id,
+                headers="{}",
+                body=body,
+                response="{}",
+                status=200,
+            )
+        )
+        db.session.execute(text("DROP TABLE request_fts"))
+        db.session.execute(
+            text("DELETE FROM schema_version WHERE version >= 3")
+        )
+        db.session.commit()
+
+    upgraded = create_app()
+    with upgraded.app_context():
+        assert get_version() == MIGRATIONS[-1].version
+        query = RequestModel.query.filter(
+            RequestModel.id.in_(search_index.match("broken"))
+        )
+        assert [request_model.body for request_model in query] == [body]
@@ -0,0 +1,65 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import patch
+
+from anyrepo.api.pool import client_pool
+from anyrepo.models import db
+
+
+@patch("anyrepo.models.api.ApiModel.get_token")
+def test_client_reused(get_token, app, dbapi):
+    get_token.return_value = "test"
+    with app.app_context():
+        client = dbapi.get_client()
+        assert dbapi.get_client() is client
+        assert get_token.call_count == 1
+
+
+def test_client_rebuilt_on_change(app, dbapi):
+    with app.app_context():
+        client = dbapi.get_client()
+
+        dbapi.set_token("another token")
+        db.session.commit()
+        new_client = dbapi.get_client()
+        assert new_client is not client
+        assert new_client.token == "another token"
+
+        dbapi.url = "https://another.fakeapi.com"
+        db.session.commit()
+        assert dbapi.get_client() is not new_client
+
+
+def test_client_invalidate(app, dbapi):
+    with app.app_context():
+        client = dbapi.get_client()
+        client_pool.invalidate(dbapi.id)
+        assert dbapi.get_client() is not client
+
+
+def test_client_invalidated_on_edit(app, client, dbapi):
+    with app.app_context():
+        api_client = dbapi.get_client()
+
+        data = {
+            "name": dbapi.name,
+            "api_type": "GITHUB",
+            "url": dbapi.url,
+            "token": "test",
+        }
+        client.post(f"/api/edit/{dbapi.slug}/", data=data)
+        assert dbapi.get_client() is not api_client
@@ -0,0 +1,157 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from anyrepo.api.github_api import GithubAPI
+from anyrepo.api.gitlab_api import GitlabAPI
+from anyrepo.api.ratelimit import RateBudget, RateLimited
+
+NOW = 1600000000.0
+
+
+@pytest.fixture
+def clock():
+    with patch("anyrepo.api.ratelimit.time") as time_:
+        time_.time.return_value = NOW
+        yield time_
+
+
+def test_budget_tracked(clock):
+    budget = RateBudget()
+    assert budget.update({"X-RateLimit-Remaining": "4999"}) is False
+    assert budget.remaining == 4999
+
+    limited = budget.update(
+        {
+            "RateLimit-Limit": "600",
+            "RateLimit-Remaining": "0",
+            "RateLimit-Reset": str(NOW + 60),
+        }
+    )
+    assert limited is True
+    assert (budget.limit, budget.remaining) == (600, 0)
+    assert budget.stats["reset"].timestamp() == NOW + 60
+
+
+def test_ample_budget_not_waited(clock):
+    budget = RateBudget()
+    budget.update(
+        {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "4000",
+            "X-RateLimit-Reset": str(NOW + 3600),
+        }
+    )
+    for _ in range(3):
+        budget.acquire()
+    clock.sleep.assert_not_called()
+    assert budget.remaining == 3997
+
+
+def test_low_budget_paced(clock):
+    budget = RateBudget(reserve=10)
+    budget.update(
+        {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "110",
+            "X-RateLimit-Reset": str(NOW + 100),
+        }
+    )
+    budget.acquire()
+    budget.acquire()
+    clock.sleep.assert_called_once_with(1.0)
+
+
+def test_exhausted_budget_waited(clock):
+    budget = RateBudget(reserve=10, max_wait=60)
+    budget.update(
+        {
+            "X-RateLimit-Limit": "5000",
+            "X-RateLimit-Remaining": "10",
+            "X-RateLimit-Reset": str(NOW + 30),
+        }
+    )
+    budget.acquire()
+    clock.sleep.assert_called_once_with(30)
+
+    budget.update({"X-RateLimit-Reset": str(NOW + 120)})
+    with pytest.raises(RateLimited):
+        budget.acquire()
+
+
+def test_retry_after_waited(clock):
+    budget = RateBudget()
+    assert budget.update({"Retry-After": "20"}) is True
+    budget.acquire()
+    clock.sleep.assert_called_once_with(20)
+
+
+@patch("anyrepo.api.ratelimit.time")
+@patch("github.Requester.Requester._Requester__requestRaw")
+def test_github_secondary_limit_retried(request_raw, time_):
+    time_.time.return_value = NOW
+    repo = json.dumps({"full_name": "anybox/anyrepo"})
+    request_raw.side_effect = [
+        (403, {"retry-after": "5"}, json.dumps({"message": "abuse"})),
+        (200, {"x-ratelimit-remaining": "4998"}, repo),
+    ]
+    api = GithubAPI("https://api.github.com", "mytoken")
+
+    project = api.get_project_from_name("anybox/anyrepo")
+    assert project.path == "anybox/anyrepo"
+    time_.sleep.assert_called_once_with(5)
+    assert api.budget.remaining == 4998
+
+
+@patch("requests.Session.send")
+def test_gitlab_budget_tracked(send):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update(
+        {"Content-Type": "application/json", "RateLimit-Remaining": "599"}
+    )
+    response._content = json.dumps(
+        {"id": 1, "path_with_namespace": "anybox/anyrepo"}
+    ).encode()
+    send.return_value = response
+    api = GitlabAPI("https://gitlab.com", "mytoken")
+
+    project = api.get_project_from_name("anybox/anyrepo")
+    assert project.path == "anybox/anyrepo"
+    assert api.budget.remaining == 599
+
+
+def test_api_list_budget(app, client, dbapi):
+    with app.app_context():
+        api_client = dbapi.get_client()
+        api_client.budget.update(
+            {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4321"}
+        )
+
+    res = client.get("/apis/")
+    assert b"4321/5000 calls left" in res.data
+
+
+def test_unknown_budget_hidden(app, client, dbapi):
+    with app.app_context():
+        dbapi.get_client()
+    res = client.get("/apis/")
+    assert b"calls left" not in res.data
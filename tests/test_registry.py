@@ -0,0 +1,49 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import patch
+
+from anyrepo.hooks.registry import hook_registry
+from anyrepo.models.hook import HookModel, HookType
+
+
+@patch("anyrepo.hooks.registry.HookModel")
+def test_hooks_loaded(hook_patched, app):
+    with app.app_context():
+        hook = hook_registry.get("/gitlab/")
+        assert hook.hook_type == HookType.GITLAB
+        assert hook.secret == "mysecret"
+        assert hook_registry.get("/github/").secret == "mysecondsecret"
+        assert not hook_patched.query.filter_by.called
+
+
+def test_hook_reloaded(app):
+    with app.app_context():
+        dbhook = HookModel.query.filter_by(endpoint="/gitlab/").one()
+        hook_registry.invalidate()
+        assert hook_registry.get("/gitlab/").id == dbhook.id
+        assert hook_registry.get("/unknown/") is None
+
+
+def test_hook_invalidated_on_edit(app, client):
+    with app.app_context():
+        dbhook = HookModel.query.filter_by(endpoint="/gitlab/").one()
+        client.post(f"/hook/edit/{dbhook.slug}/", data={"secret": "new"})
+        assert hook_registry.get("/gitlab/").secret == "new"
+
+    headers = {"X-Gitlab-Token": "new", "X-Gitlab-Event": "ping"}
+    res = client.post("/gitlab/", json={}, headers=headers)
+    assert res.status_code == 200
@@ -0,0 +1,131 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import time
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from click.testing import CliRunner
+
+from anyrepo.cli import main
+from anyrepo.models import db
+from anyrepo.models.hook import HookType
+from anyrepo.models.request import RequestModel
+from anyrepo.replay import RateLimiter, replay_requests
+
+
+@pytest.fixture
+def handler():
+    handler_ = MagicMock(return_value={"FakeAPI": {"status": "done"}})
+    with patch.dict("anyrepo.worker.HANDLERS", {HookType.GITLAB: handler_}):
+        yield handler_
+
+
+@pytest.fixture
+def requests(app, gitlab_hook):
+    with app.app_context():
+        requests_ = []
+        for day, status in [(1, 200), (2, 403), (3, 502), (4, 202)]:
+            request_model = RequestModel(
+                hook_id=gitlab_hook.id,
+                headers=json.dumps({"X-Gitlab-Event": "Issue Hook"}),
+                body=json.dumps({"day": day}),
+                response="{}",
+                status=status,
+                created_at=datetime(2020, 1, day),
+            )
+            db.session.add(request_model)
+            requests_.append(request_model)
+        db.session.commit()
+        yield [
+            (request_model.id, request_model.slug)
+            for request_model in requests_
+        ]
+
+
+def test_requests_replayed(app, handler, requests):
+    outcomes = replay_requests(app, [id_ for id_, _ in requests], 2, 0)
+    # the request rejected by validation is not replayed
+    assert outcomes == {"replayed": 3, "failed": 1}
+    calls = sorted(call.args[1]["day"] for call in handler.call_args_list)
+    assert calls == [1, 3, 4]
+    assert handler.call_args.args[0] == "Issue Hook"
+    assert handler.call_args.args[2] == "/gitlab/"
+
+
+def test_replay_failures_counted(app, handler, requests):
+    handler.side_effect = [
+        {"FakeAPI": {"status": "error"}},
+        ValueError("Boom"),
+        {"status": "skipped"},
+    ]
+    outcomes = replay_requests(app, [id_ for id_, _ in requests] + [0], 1, 0)
+    assert outcomes == {"failed": 4, "replayed": 1}
+
+
+def test_replay_rate_limited():
+    limiter = RateLimiter(20)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.wait()
+    assert time.monotonic() - start >= 0.1
+
+
+def test_request_replay_view(client, handler, requests, gitlab_hook):
+    res = client.post("/request/replay/", data={"slug": requests[2][1]})
+    assert res.status_code == 302
+    assert res.location.endswith(f"/hook/details/{gitlab_hook.slug}/")
+    assert handler.call_args.args[1] == {"day": 3}
+
+    res = client.post("/request/replay/", data={"slug": requests[1][1]})
+    assert res.status_code == 302
+    assert handler.call_count == 1
+
+    res = client.get(f"/hook/details/{gitlab_hook.slug}/")
+    assert res.data.count(b'name="slug"') == 3
+
+    res = client.post("/request/replay/", data={"slug": "unknown"})
+    assert res.status_code == 404
+
+
+@patch("anyrepo.views.start_replay")
+def test_hook_replay_view(start_replay, client, requests, gitlab_hook):
+    res = client.post(
+        f"/hook/replay/{gitlab_hook.slug}/", data={"status": "bad"}
+    )
+    assert res.status_code == 302
+    assert res.location.endswith(
+        f"/hook/details/{gitlab_hook.slug}/?status=bad"
+    )
+    assert start_replay.call_args.args[1] == [requests[2][0]]
+
+
+def test_replay_command(app, handler, requests):
+    result = CliRunner().invoke(
+        main, ["replay", "--hook", "/gitlab/", "--status", "bad", "-r", "0"]
+    )
+    assert result.exit_code == 0
+    assert result.stdout == "Replayed 1 requests, 0 failed\n"
+    assert handler.call_args.args[1] == {"day": 3}
+
+    result = CliRunner().invoke(main, ["replay", requests[0][1]])
+    assert result.stdout == "Replayed 1 requests, 0 failed\n"
+    assert handler.call_args.args[1] == {"day": 1}
+
+    result = CliRunner().invoke(main, ["replay", "--status", "foo"])
+    assert result.exit_code == 2
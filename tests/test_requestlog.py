@@ -0,0 +1,82 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from anyrepo.hooks.requestlog import RequestLogWriter, request_log
+from anyrepo.models.request import RequestCounterModel, RequestModel
+
+HEADERS = {"X-Gitlab-Token": "mysecret", "X-Gitlab-Event": "ping"}
+
+
+def test_request_written_through(app, client):
+    client.post("/gitlab/", json={}, headers=HEADERS)
+    with app.app_context():
+        request_model = RequestModel.query.one()
+        assert request_model.status == 200
+        assert request_model.hook.endpoint == "/gitlab/"
+        assert request_model.slug
+
+
+def test_requests_batched(app, client):
+    app.extensions["anyrepo_requests"] = RequestLogWriter(app, 3, 60)
+
+    for _ in range(2):
+        client.post("/gitlab/", json={}, headers=HEADERS)
+    with app.app_context():
+        assert RequestModel.query.count() == 0
+
+    client.post("/gitlab/", json={}, headers=HEADERS)
+    with app.app_context():
+        assert RequestModel.query.count() == 3
+        slugs = {request_model.slug for request_model in RequestModel.query}
+        assert len(slugs) == 3
+
+        client.post("/gitlab/", json={}, headers=HEADERS)
+        request_log.flush()
+        assert RequestModel.query.count() == 4
+
+
+def test_requests_flushed_on_interval(app, client):
+    app.extensions["anyrepo_requests"] = RequestLogWriter(app, 100, 0.05)
+
+    client.post("/gitlab/", json={}, headers=HEADERS)
+    with app.app_context():
+        deadline = time.monotonic() + 5
+        while not RequestModel.query.count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert RequestModel.query.count() == 1
+
+
+def test_requests_counted(app, client, gitlab_hook):
+    app.extensions["anyrepo_requests"] = RequestLogWriter(app, 3, 60)
+
+    for _ in range(3):
+        client.post("/gitlab/", json={}, headers=HEADERS)
+    client.post("/gitlab/", json={}, headers={"X-Gitlab-Token": "wrong"})
+
+    with app.app_context():
+        request_log.flush()
+        counter = RequestCounterModel.query.filter_by(status=200).one()
+        assert counter.hook_id == gitlab_hook.id
+        assert counter.count == 3
+        assert RequestCounterModel.get_total(succeeded=True) == 3
+        assert RequestCounterModel.get_total(succeeded=False) == 1
+
+    res = client.get("/")
+    data = b"".join(res.data.split())
+    assert b'1<iclass="fasfa-times">' in data
+    assert b'3<iclass="fasfa-check">' in data
@@ -0,0 +1,98 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+
+from anyrepo.models import db
+from anyrepo.models.job import JobModel, JobStatus
+from anyrepo.models.request import RequestModel
+from anyrepo.retention import purge_requests
+
+
+def add_request(hook_id: int, status: int, days: int) -> RequestModel:
+    request_model = RequestModel(
+        hook_id=hook_id,
+        headers="{}",
+        body="{}",
+        response="{}",
+        status=status,
+        created_at=datetime.utcnow() - timedelta(days=days),
+    )
+    db.session.add(request_model)
+    db.session.commit()
+    return request_model
+
+
+def test_purge_disabled(app, gitlab_hook):
+    with app.app_context():
+        add_request(gitlab_hook.id, 200, 1000)
+        assert purge_requests() == 0
+        assert RequestModel.query.count() == 1
+
+
+def test_purge_by_age(app, gitlab_hook):
+    app.config["REQUEST_RETENTION_DAYS"] = 30
+    app.config["REQUEST_FAILURE_RETENTION_DAYS"] = 90
+    app.config["REQUEST_PURGE_CHUNK_SIZE"] = 2
+
+    with app.app_context():
+        for _ in range(5):
+            add_request(gitlab_hook.id, 200, 60)
+        recent = add_request(gitlab_hook.id, 200, 1)
+        failed = add_request(gitlab_hook.id, 500, 60)
+        add_request(gitlab_hook.id, 403, 120)
+
+        assert purge_requests() == 6
+        remaining = {request_model.id for request_model in RequestModel.query}
+        assert remaining == {recent.id, failed.id}
+
+
+def test_purge_by_count(app, gitlab_hook, github_hook):
+    app.config["REQUEST_RETENTION_COUNT"] = 2
+
+    with app.app_context():
+        gitlab_requests = [add_request(gitlab_hook.id, 200, 0) for _ in "abc"]
+        failed = add_request(gitlab_hook.id, 500, 0)
+        github_requests = [add_request(github_hook.id, 202, 0) for _ in "ab"]
+
+        assert purge_requests() == 1
+        remaining = {request_model.id for request_model in RequestModel.query}
+        expected = gitlab_requests[1:] + [failed] + github_requests
+        assert remaining == {request_model.id for request_model in expected}
+
+
+def test_purge_jobs(app, gitlab_hook):
+    app.config["REQUEST_RETENTION_DAYS"] = 30
+    app.config["REQUEST_FAILURE_RETENTION_DAYS"] = 90
+    app.config["REQUEST_PURGE_CHUNK_SIZE"] = 2
+
+    with app.app_context():
+        created_at = datetime.utcnow() - timedelta(days=60)
+        for status in (JobStatus.DONE,) * 3 + tuple(JobStatus):
+            db.session.add(
+                JobModel(
+                    hook_id=gitlab_hook.id,
+                    event_type="Issue Hook",
+                    payload="{}",
+                    status=status,
+                    created_at=created_at,
+                )
+            )
+        db.session.commit()
+
+        assert purge_requests() == 0
+        remaining = sorted(job.status.value for job in JobModel.query)
+        assert remaining == ["failed", "pending", "running"]
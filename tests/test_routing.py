@@ -0,0 +1,67 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from unittest.mock import patch
+
+from anyrepo.hooks.routing import routing_table
+from anyrepo.models import db
+from anyrepo.models.api import ApiModel
+
+
+def test_targets(app):
+    with app.app_context():
+        targets = routing_table.get_targets("github.com")
+        assert [target.host for target in targets] == [
+            "gitlab.com",
+            "gitlab.myurl.cloud",
+        ]
+        assert [target.name for target in targets] == [
+            "gitlab",
+            "anothergitlab",
+        ]
+
+        targets = routing_table.get_targets("unknown.com")
+        assert len(targets) == ApiModel.query.count()
+
+
+def test_targets_cached(app):
+    with app.app_context():
+        targets = routing_table.get_targets("gitlab.com")
+        with patch("anyrepo.hooks.routing.Session") as session_patched:
+            assert routing_table.get_targets("gitlab.com") == targets
+            assert not session_patched.called
+
+        # detached rows outlive the request session
+        db.session.commit()
+        assert targets[0].api.url == "https://gitlab.myurl.cloud"
+
+
+def test_targets_rebuilt_on_edit(app, client):
+    with app.app_context():
+        assert len(routing_table.get_targets("github.com")) == 2
+        api = ApiModel.query.filter_by(name="anothergitlab").one()
+        data = {
+            "name": api.name,
+            "api_type": "GITHUB",
+            "url": "https://github.com/",
+            "token": "test",
+        }
+        client.post(f"/api/edit/{api.slug}/", data=data)
+        assert len(routing_table.get_targets("github.com")) == 1
+
+        client.post("/api/delete/", data={"slug": api.slug})
+        targets = routing_table.get_targets("github.com")
+        assert [target.name for target in targets] == ["gitlab"]
@@ -0,0 +1,99 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from anyrepo.migrations import migrate
+from anyrepo.models import db
+from anyrepo.models.request import RequestModel
+from anyrepo.models.search import search_index
+from anyrepo.retention import purge_requests
+
+HEADERS = {"X-Gitlab-Token": "mysecret", "X-Gitlab-Event": "ping"}
+
+
+def search(terms: str):
+    query = RequestModel.query.filter(
+        RequestModel.id.in_(search_index.match(terms))
+    )
+    return {request_model.body for request_model in query}
+
+
+def test_logged_requests_indexed(app, client):
+    client.post("/gitlab/", json={"title": "Broken build"}, headers=HEADERS)
+    client.post("/gitlab/", json={"title": "New feature"}, headers=HEADERS)
+
+    with app.app_context():
+        assert search_index.enabled
+        assert search("broken") == {'{"title": "Broken build"}'}
+        assert search('build "feature') == set()
+        assert len(search("title")) == 2
+
+
+def test_hook_requests_searched(app, client, gitlab_hook):
+    client.post("/gitlab/", json={"title": "Broken build"}, headers=HEADERS)
+    client.post("/gitlab/", json={"title": "New feature"}, headers=HEADERS)
+
+    res = client.get(f"/hook/details/{gitlab_hook.slug}/?q=feature")
+    assert res.status_code == 200
+    assert res.data.count(b"<details") == 1
+    assert b'value="feature"' in res.data
+
+    res = client.get(f"/hook/details/{gitlab_hook.slug}/?q=+")
+    assert res.data.count(b"<details") == 2
+
+
+def test_existing_requests_indexed(app, gitlab_hook):
+    with app.app_context():
+        db.session.add(
+            RequestModel(
+                hook_id=gitlab_hook.id,
+                headers="{}",
+                body='{"title": "Broken build"}',
+                response="{}",
+                status=200,
+            )
+        )
+        db.session.execute(text("DROP TABLE request_fts"))
+        db.session.execute(
+            text("DELETE FROM schema_version WHERE version >= 3")
+        )
+        db.session.commit()
+
+        migrate()
+        assert search("broken") == {'{"title": "Broken build"}'}
+
+
+def test_purged_requests_unindexed(app, client):
+    app.config["REQUEST_RETENTION_DAYS"] = 30
+    client.post("/gitlab/", json={"title": "Broken build"}, headers=HEADERS)
+    client.post("/gitlab/", json={"title": "Broken test"}, headers=HEADERS)
+
+    with app.app_context():
+        old = RequestModel.query.order_by(RequestModel.id.desc()).first()
+        old.created_at = datetime.utcnow() - timedelta(days=60)
+        db.session.commit()
+
+        assert purge_requests() == 1
+        assert search("broken") == {'{"title": "Broken build"}'}
+        db.session.execute(
+            text(
+                "INSERT INTO request_fts (request_fts) "
+                "VALUES ('integrity-check')"
+            )
+        )
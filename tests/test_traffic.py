@@ -0,0 +1,85 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from anyrepo.hooks.requestlog import request_log
+from anyrepo.models import db
+from anyrepo.models.traffic import HOUR, MINUTE, TrafficModel, get_bucket
+from anyrepo.retention import purge_requests
+
+
+def test_bucket():
+    at = datetime(2020, 5, 4, 13, 42, 21, 1234)
+    assert get_bucket(at, MINUTE) == datetime(2020, 5, 4, 13, 42)
+    assert get_bucket(at, HOUR) == datetime(2020, 5, 4, 13)
+
+
+@patch("anyrepo.models.api.ApiModel.get_client")
+def test_traffic_recorded(
+    get_client, app, client, api, dbapi, project, gl_headers, new_gl_issue_str
+):
+    get_client.return_value = api
+    project.get_issue_from_title = lambda x: None
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+
+    for _ in range(2):
+        client.post(
+            "/gitlab/",
+            data=new_gl_issue_str,
+            content_type="application/json",
+            environ_base=gl_headers,
+        )
+
+    with app.app_context():
+        request_log.flush()
+        rows = TrafficModel.query.filter_by(api_id=None).all()
+        assert {(row.period, row.outcome, row.count) for row in rows} == {
+            (MINUTE, "200", 2),
+            (HOUR, "200", 2),
+        }
+
+        outcomes = TrafficModel.get_outcomes(datetime.utcnow())
+        assert outcomes["FakeAPI"] == {"done": 2}
+
+        series = TrafficModel.get_deliveries(datetime.utcnow())
+        assert len(series) == 60
+        assert sum(good + bad for _, good, bad in series) == 2
+
+    res = client.get("/")
+    assert res.status_code == 200
+    assert b"2 done" in res.data
+    assert b"2 succeeded, 0 failed" in res.data
+
+
+def test_minute_traffic_purged(app, gitlab_hook):
+    with app.app_context():
+        old = datetime.utcnow() - timedelta(days=3)
+        for period in (MINUTE, HOUR):
+            db.session.add(
+                TrafficModel(
+                    period=period,
+                    bucket=get_bucket(old, period),
+                    hook_id=gitlab_hook.id,
+                    outcome="200",
+                    count=1,
+                )
+            )
+        db.session.commit()
+
+        purge_requests()
+        assert [row.period for row in TrafficModel.query] == [HOUR]
@@ -14,15 +14,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import html
 import random
+import re
 import string
+from datetime import datetime
+from typing import List
 from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 
 import ldap
 
 from anyrepo.models import db
 from anyrepo.models.api import ApiModel
 from anyrepo.models.hook import HookModel
+from anyrepo.models.request import RequestModel
+from anyrepo.models.traffic import MINUTE, TrafficModel
 from anyrepo.models.user import User
 
 
@@ -79,6 +86,17 @@ def test_api_list(client):
     assert b"anothergitlab" in res.data
 
 
+def test_api_list_cache_stats(app, client, dbapi):
+    with app.app_context():
+        api_client = dbapi.get_client()
+        api_client.projects.set("test", None)
+        api_client.projects.get("test")
+
+    res = client.get("/apis/")
+    assert res.status_code == 200
+    assert b"1 hits" in res.data
+
+
 def test_hooks(client):
     res = client.get("/hooks/")
     assert res.status_code == 200
@@ -101,6 +119,77 @@ def test_hook_details(app, client, github_hook):
         assert res.status_code == 404
 
 
+def get_cursors(data: bytes) -> List[str]:
+    """Get the after cursors of the links of a page."""
+    cursors = []
+    for href in re.findall(r'href="([^"]*)"', data.decode()):
+        query = parse_qs(urlparse(html.unescape(href)).query)
+        cursors.extend(query.get("after", []))
+    return cursors
+
+
+def test_hook_details_pages(app, client, github_hook):
+    app.config["HOOK_REQUESTS_PER_PAGE"] = 2
+    with app.app_context():
+        slugs = []
+        for status in (200, 500, 202, 403, 200):
+            request_model = RequestModel(
+                hook_id=github_hook.id,
+                headers="{}",
+                body="{}",
+                response="{}",
+                status=status,
+                created_at=datetime(2020, 1, 1),
+            )
+            db.session.add(request_model)
+            db.session.commit()
+            slugs.append(request_model.slug)
+
+        url = f"/hook/details/{github_hook.slug}/"
+        res = client.get(url)
+        assert [slug.encode() in res.data for slug in slugs] == [0, 0, 0, 1, 1]
+
+        cursor = RequestModel.query.filter_by(slug=slugs[3]).one().cursor
+        assert get_cursors(res.data) == [cursor]
+
+        res = client.get(url, query_string={"after": cursor})
+        assert [slug.encode() in res.data for slug in slugs] == [0, 1, 1, 0, 0]
+
+        res = client.get(url, query_string={"status": "bad"})
+        assert [slug.encode() in res.data for slug in slugs] == [0, 1, 0, 1, 0]
+        assert get_cursors(res.data) == []
+
+        res = client.get(url, query_string={"after": "notacursor"})
+        assert res.status_code == 400
+
+        res = client.get("/hooks/")
+        assert b"3\n" in res.data.replace(b" ", b"")
+
+
+def test_request_detail(app, client, github_hook):
+    with app.app_context():
+        request_model = RequestModel(
+            hook_id=github_hook.id,
+            headers='{"X-GitHub-Event": "ping"}',
+            body="{}",
+            response='{"msg": "pong"}',
+            status=200,
+        )
+        db.session.add(request_model)
+        db.session.commit()
+
+        res = client.get(f"/request/{request_model.slug}/")
+        assert res.get_json() == {
+            "headers": '{"X-GitHub-Event": "ping"}',
+            "body": "{}",
+            "response": '{"msg": "pong"}',
+            "status": 200,
+        }
+
+    res = client.get("/request/notaslug/")
+    assert res.status_code == 404
+
+
 def test_api_edit(app, client, dbapi):
     res = client.get(f"/api/edit/{dbapi.slug}/")
     token = dbapi.get_token()
@@ -182,12 +271,25 @@ def test_new_api(app, client, dbapi):
         assert b"There is already an API for this url" in res.data
 
 
-def test_delete_api(app, client, dbapi):
+def test_delete_api(app, client, gitlab_hook, dbapi):
     with app.app_context():
+        db.session.add(
+            TrafficModel(
+                period=MINUTE,
+                bucket=datetime(2020, 1, 1),
+                hook_id=gitlab_hook.id,
+                api_id=dbapi.id,
+                outcome="done",
+                count=1,
+            )
+        )
+        db.session.commit()
+
         apicount = ApiModel.query.count()
         res = client.post("/api/delete/", data={"slug": dbapi.slug})
         assert res.status_code == 302
         assert apicount - 1 == ApiModel.query.count()
+        assert TrafficModel.query.count() == 0
 
         res = client.post("/api/delete/", data={"slug": "notaslug"})
         assert res.status_code == 404
@@ -310,8 +412,8 @@ def test_user_edit(app_without_ldap):
             data={
                 "username": user2.username,
                 "password": "test",
-                "confirm": "test"
-            }
+                "confirm": "test",
+            },
         )
         assert res.status_code == 403
         assert b"You can only edit your own data" in res.data
@@ -0,0 +1,113 @@
+# AnyRepo
+# Copyright (C) 2020  Anybox
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from anyrepo.models import db
+from anyrepo.models.job import JobModel, JobStatus
+from anyrepo.worker import claim_job, process_next_job
+
+
+def test_async_ping(app, client, gl_headers):
+    app.config["ASYNC_HOOKS"] = True
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "ping"
+    response = client.post("/gitlab/", json={}, environ_base=gl_headers)
+    assert response.status_code == 200
+    assert response.get_json() == {"msg": "pong"}
+
+    with app.app_context():
+        assert JobModel.query.count() == 0
+
+
+@patch("anyrepo.models.api.ApiModel.get_client")
+def test_async_create_issue(
+    get_client, app, client, api, dbapi, project, gl_headers, new_gl_issue_str
+):
+    app.config["ASYNC_HOOKS"] = True
+    get_client.return_value = api
+    project.get_issue_from_title = lambda x: None
+    gl_headers["HTTP_X_GITLAB_EVENT"] = "Issue Hook"
+
+    response = client.post(
+        "/gitlab/",
+        data=new_gl_issue_str,
+        content_type="application/json",
+        environ_base=gl_headers,
+    )
+
+    json_data = response.get_json()
+    assert response.status_code == 202
+    assert json_data["status"] == "queued"
+
+    with app.app_context():
+        job = JobModel.query.filter_by(slug=json_data["job"]).one()
+        assert job.status == JobStatus.PENDING
+        assert job.event_type == "Issue Hook"
+
+        assert process_next_job() is True
+        job = JobModel.query.filter_by(slug=json_data["job"]).one()
+        assert job.status == JobStatus.DONE
+        assert job.attempts == 1
+        assert json.loads(job.response) == {"FakeAPI": {"status": "done"}}
+
+        assert process_next_job() is False
+
+
+def test_async_invalid_payload(app, client, gl_headers, gitlab_hook):
+    with app.app_context():
+        job = JobModel(
+            hook_id=gitlab_hook.id, event_type="Issue Hook", payload="{}"
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        assert process_next_job() is True
+        assert job.status == JobStatus.FAILED
+        assert json.loads(job.response) == {"status": "error"}
+
+
+def test_claim_expired_job(app, gitlab_hook):
+    with app.app_context():
+        started_at = datetime.utcnow() - timedelta(hours=1)
+        stale = JobModel(
+            hook_id=gitlab_hook.id,
+            event_type="Issue Hook",
+            payload="{}",
+            status=JobStatus.RUNNING,
+            attempts=1,
+            started_at=started_at,
+        )
+        exhausted = JobModel(
+            hook_id=gitlab_hook.id,
+            event_type="Issue Hook",
+            payload="{}",
+            status=JobStatus.RUNNING,
+            attempts=3,
+            started_at=started_at,
+        )
+        db.session.add_all([stale, exhausted])
+        db.session.commit()
+
+        job = claim_job()
+        assert job.id == stale.id
+        assert job.attempts == 2
+        assert job.started_at > started_at
+
+        db.session.refresh(exhausted)
+        assert exhausted.status == JobStatus.FAILED
+        assert claim_job() is None